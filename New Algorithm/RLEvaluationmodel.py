@@ -4,7 +4,10 @@ import numpy as np
 from gym import spaces
 import torch
 from stable_baselines3 import PPO
-from stable_baselines3.common.env_util import make_vec_env
+from encoder import encode_board, encode_boards
+from evalservice import EvaluationService
+from vecenv import ChessVecEnv
+from plystate import PlyState
 
 ###############################################################################
 # 1) Chess Environment for PPO Training
@@ -22,44 +25,32 @@ class ChessEvaluationEnv(gym.Env):
         
         # Action space: Continuous value [-1, 1] representing evaluation
         self.action_space = spaces.Box(low=-1, high=1, shape=(1,), dtype=np.float32)
+        self.state = PlyState(self.board)
 
     def reset(self):
         """Resets the board and returns an observation."""
         self.board.reset()
+        self.state = PlyState(self.board)
         return self._get_observation()
 
     def _get_observation(self):
         """Encodes the board into a tensor representation."""
-        planes = np.zeros((8, 8, 12), dtype=np.float32)
-        piece_map = {
-            "P": 0, "N": 1, "B": 2, "R": 3, "Q": 4, "K": 5,
-            "p": 6, "n": 7, "b": 8, "r": 9, "q": 10, "k": 11
-        }
-        for square in range(64):
-            piece = self.board.piece_at(square)
-            if piece:
-                row, col = divmod(square, 8)
-                planes[row, col, piece_map[piece.symbol()]] = 1
-        return planes
+        return encode_board(self.board)
 
     def step(self, action):
         """Executes a random legal move and assigns rewards based on the game outcome."""
-        legal_moves = list(self.board.legal_moves)
-        if len(legal_moves) == 0:
-            return self._get_observation(), -1, True, {}  # Loss if no moves left
+        reward, done, info = self.play(action)
+        return self._get_observation(), reward, done, info
+
+    def play(self, action):
+        """step() without the observation, ChessVecEnv encodes all boards at once."""
+        # Legal moves, reward and done all come from one PlyState per position
+        if not self.state.legal_moves:
+            return -1, True, {}  # Loss if no moves left
         
-        self.board.push(np.random.choice(legal_moves))  # Simulated move
-        
-        # Reward system: Win = +1, Loss = -1, Draw = 0, small -0.01 per move
-        if self.board.is_checkmate():
-            reward = 1 if self.board.turn == chess.BLACK else -1
-        elif self.board.is_stalemate() or self.board.is_insufficient_material():
-            reward = 0  # Draw
-        else:
-            reward = -0.01  # Small penalty to encourage faster wins
-        
-        done = self.board.is_game_over()
-        return self._get_observation(), reward, done, {}
+        self.board.push(np.random.choice(self.state.legal_moves))  # Simulated move
+        self.state = PlyState(self.board)
+        return self.state.reward(), self.state.done, {}
 
     def render(self, mode="human"):
         print(self.board)
@@ -70,46 +61,59 @@ class ChessEvaluationEnv(gym.Env):
 ###############################################################################
 # 2) Train PPO for Board Evaluation
 ###############################################################################
-def train_ppo_evaluation():
+def train_ppo_evaluation(n_envs=8, n_workers=None):
     """
     Trains PPO to learn an evaluation function for chess positions.
+    n_envs independent games are stepped by n_workers processes.
     """
-    env = ChessEvaluationEnv()
-    vec_env = make_vec_env(lambda: env, n_envs=4)  # Parallel training
+    vec_env = ChessVecEnv(ChessEvaluationEnv, n_envs=n_envs, n_workers=n_workers)  # Parallel training
 
     model = PPO("CnnPolicy", vec_env, verbose=1)
     model.learn(total_timesteps=500000)  # Train for 500,000 steps
 
     model.save("ppo_chess_evaluation")
+    vec_env.close()
     return model
 
 ###############################################################################
 # 3) PPO-Based Board Evaluation Function
 ###############################################################################
+def evaluate_positions(boards, model):
+    """
+    Evaluates a list of boards in one batch, the PPO action is the evaluation.
+    Returns a float array in [-1, 1], one value per board.
+    """
+    obs = encode_boards(boards)
+    actions, _ = model.predict(obs, deterministic=True)  # Deterministic, so results can be cached
+    return np.clip(np.asarray(actions, dtype=np.float32).reshape(len(boards), -1)[:, 0], -1, 1)
+
 def evaluate_position(board, model):
     """
     Uses the trained PPO model to evaluate a board position.
     Returns a float in [-1, 1], indicating game advantage.
     """
-    obs = ChessEvaluationEnv()._get_observation()
-    obs = obs.reshape((1, 8, 8, 12))  # Add batch dimension
-    value = model.predict(obs)[0]  # PPO model evaluates board
-    
-    return value
+    return float(evaluate_positions([board], model)[0])
+
+def make_evaluation_service(model, max_entries=100000):
+    """
+    EvaluationService that caches evaluate_positions for this model.
+    """
+    return EvaluationService(lambda boards: evaluate_positions(boards, model), max_entries)
 
 ###############################################################################
 # 4) Minimax Algorithm with PPO Evaluation
 ###############################################################################
-def alpha_beta_search(board, depth, alpha, beta, is_maximizing, model):
+def alpha_beta_search(board, depth, alpha, beta, is_maximizing, model, service=None):
     """
     Minimax with Alpha-Beta pruning using PPO-based evaluation.
+    Leaves go through the EvaluationService cache when one is given.
     """
     if board.is_game_over() or depth == 0:
-        return evaluate_position(board, model), None
+        return leaf_value(board, model, service), None
 
     legal_moves = list(board.legal_moves)
     if not legal_moves:
-        return evaluate_position(board, model), None
+        return leaf_value(board, model, service), None
 
     best_move = None
 
@@ -117,7 +121,7 @@ def alpha_beta_search(board, depth, alpha, beta, is_maximizing, model):
         value = float('-inf')
         for move in legal_moves:
             board.push(move)
-            new_value, _ = alpha_beta_search(board, depth - 1, alpha, beta, False, model)
+            new_value, _ = alpha_beta_search(board, depth - 1, alpha, beta, False, model, service)
             board.pop()
 
             if new_value > value:
@@ -131,7 +135,7 @@ def alpha_beta_search(board, depth, alpha, beta, is_maximizing, model):
         value = float('inf')
         for move in legal_moves:
             board.push(move)
-            new_value, _ = alpha_beta_search(board, depth - 1, alpha, beta, True, model)
+            new_value, _ = alpha_beta_search(board, depth - 1, alpha, beta, True, model, service)
             board.pop()
 
             if new_value < value:
@@ -142,6 +146,11 @@ def alpha_beta_search(board, depth, alpha, beta, is_maximizing, model):
                 break
         return value, best_move
 
+def leaf_value(board, model, service):
+    if service is not None:
+        return service.evaluate(board)
+    return evaluate_position(board, model)
+
 ###############################################################################
 # 5) Hybrid Chess Bot (Minimax + PPO Evaluation)
 ###############################################################################
@@ -153,17 +162,26 @@ def play_chess():
         print("No trained model found. Training PPO now...")
         ppo_model = train_ppo_evaluation()
 
+    # The cache is kept between moves, the next search revisits most leaves
+    service = make_evaluation_service(ppo_model)
+
     # Start a chess game
     board = chess.Board()
 
     while not board.is_game_over():
-        _, best_move = alpha_beta_search(board, depth=3, alpha=float('-inf'), beta=float('inf'), is_maximizing=board.turn == chess.WHITE, model=ppo_model)
+        hits, misses = service.hits, service.misses
+        _, best_move = alpha_beta_search(board, depth=3, alpha=float('-inf'), beta=float('inf'), is_maximizing=board.turn == chess.WHITE, model=ppo_model, service=service)
         board.push(best_move)
 
+        lookups = service.hits + service.misses - hits - misses
+        move_hits = service.hits - hits
+        print(f"Ply {len(board.move_stack)}: {best_move}  cache hits {move_hits}/{lookups} ({move_hits / max(lookups, 1):.1%})")
+
     # Print final game result
     print("\nFinal Board State:")
     print(board)
     print("Game Result:", board.result())
+    print("Evaluation cache:", service.stats())
 
 if __name__ == "__main__":
     play_chess()
@@ -0,0 +1,96 @@
+import chess
+import numpy as np
+
+###############################################################################
+# Shared board encoding
+###############################################################################
+# A board becomes 12 planes of 8x8, one per piece type and color:
+#   [White Pawn, Knight, Bishop, Rook, Queen, King,
+#    Black Pawn, Knight, Bishop, Rook, Queen, King]
+# planes[rank, file, piece] is 1 where that piece stands, with rank 0 being
+# the first rank. Flattened, index 12 * square + piece is the same layout as
+# the 768-long vector rlmodel.ChessValueNetwork takes.
+#
+# Instead of asking every square for its piece, the 12 piece bitboards of
+# each board are unpacked with np.unpackbits, so a whole batch is encoded
+# with a handful of NumPy operations.
+###############################################################################
+PLANE_SHAPE = (8, 8, 12)
+PLANE_SIZE = 768
+
+def board_masks(board):
+    """
+    The 8 python-chess masks the piece bitboards are built from: the six
+    piece types followed by the white and black occupancy.
+    """
+    return (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+            board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK])
+
+def bitboards_from_masks(masks, out=None):
+    """
+    Turns a list of board_masks() tuples into (N, 12) uint64 piece bitboards.
+    Lets a caller walking through a game keep only 8 ints per position.
+    """
+    masks = np.array(masks, dtype=np.uint64).reshape(-1, 8)
+
+    if out is None:
+        out = np.empty((len(masks), 12), dtype=np.uint64)
+    np.bitwise_and(masks[:, :6], masks[:, 6:7], out=out[:, :6])
+    np.bitwise_and(masks[:, :6], masks[:, 7:8], out=out[:, 6:])
+    return out
+
+def board_bitboards(boards, out=None):
+    """
+    Returns the 12 piece bitboards of each board as a (N, 12) uint64 array.
+    """
+    return bitboards_from_masks([board_masks(board) for board in boards], out)
+
+def planes_from_bitboards(bitboards, out=None, dtype=np.float32):
+    """
+    Unpacks (N, 12) piece bitboards into (N, 8, 8, 12) planes.
+    out can be any preallocated (N, 8, 8, 12) or (N, 768) array, it is
+    filled in place and returned.
+    """
+    n = len(bitboards)
+    if out is None:
+        out = np.empty((n,) + PLANE_SHAPE, dtype=dtype)
+
+    # Little endian bytes of square 0..63, bit 0 of byte 0 being a1
+    squares = np.ascontiguousarray(bitboards, dtype="<u8").view(np.uint8).reshape(n, 12, 8)
+    bits = np.unpackbits(squares, axis=-1, bitorder="little")
+
+    # (N, 12, 64) piece-major bits into the square-major buffer
+    np.copyto(out.reshape(n, 64, 12).transpose(0, 2, 1), bits)
+    return out
+
+def encode_boards(boards, out=None, dtype=np.float32):
+    """
+    Encodes a list of boards into (N, 8, 8, 12) planes, or into out.
+    """
+    return planes_from_bitboards(board_bitboards(boards), out, dtype)
+
+def encode_board(board, dtype=np.float32):
+    """
+    Encodes one board into (8, 8, 12) planes.
+    """
+    return encode_boards([board], dtype=dtype)[0]
+
+class BoardEncoder:
+    """
+    Encodes batches into one buffer that is allocated once and reused.
+    The returned arrays are views of that buffer and are overwritten by the
+    next call, copy them if they have to be kept.
+    """
+    def __init__(self, batch_size, flat=False, dtype=np.float32):
+        self.batch_size = batch_size
+        shape = (batch_size, PLANE_SIZE) if flat else (batch_size,) + PLANE_SHAPE
+        self.buffer = np.zeros(shape, dtype=dtype)
+        self.bitboards = np.zeros((batch_size, 12), dtype=np.uint64)
+
+    def encode(self, boards):
+        n = len(boards)
+        if n > self.batch_size:
+            raise ValueError(f"{n} boards do not fit a batch of {self.batch_size}")
+
+        board_bitboards(boards, self.bitboards[:n])
+        return planes_from_bitboards(self.bitboards[:n], self.buffer[:n])
@@ -0,0 +1,76 @@
+import chess
+import chess.polyglot
+import numpy as np
+from collections import OrderedDict
+
+###############################################################################
+# Cached position evaluation
+###############################################################################
+class EvaluationService:
+    """
+    Evaluates boards through a batch evaluation function and memoizes the
+    results in a bounded LRU cache keyed by the position's Zobrist hash.
+    The same position reached through different move orders (very common in
+    a minimax tree) is only sent to the network once.
+    """
+    def __init__(self, evaluate_batch, max_entries=100000):
+        self.evaluate_batch = evaluate_batch
+        self.max_entries = max_entries
+        self.clear()
+
+    def clear(self):
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def evaluate(self, board):
+        """Value of one board."""
+        key = chess.polyglot.zobrist_hash(board)
+        value = self._lookup(key)
+        if value is None:
+            value = float(self.evaluate_batch([board])[0])
+            self._store(key, value)
+        return value
+
+    def evaluate_many(self, boards):
+        """Values of several boards, the uncached ones go through one batch."""
+        keys = [chess.polyglot.zobrist_hash(board) for board in boards]
+        values = [self._lookup(key) for key in keys]
+
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            results = self.evaluate_batch([boards[i] for i in missing])
+            for i, value in zip(missing, np.asarray(results, dtype=np.float64).tolist()):
+                values[i] = value
+                self._store(keys[i], value)
+
+        return values
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,97 @@
+import chess
+import numpy as np
+
+###############################################################################
+# 4672 Move Codec
+###############################################################################
+# Every move is named by its from-square and one of 73 move types, so an
+# action means the same move in every position where it is legal:
+#
+#   action = 73 * from_square + move_type
+#
+#   move types  0..55  queen-like moves, 8 directions x 7 distances
+#                      (direction * 7 + distance - 1), this includes king
+#                      moves, castling (two squares) and queen promotions
+#              56..63  the 8 knight jumps
+#              64..72  underpromotions to a knight, bishop or rook, moving
+#                      left, straight or right (file step + 1) * 3 + piece
+#
+# Squares are python-chess squares from White's side, like the observation
+# planes. Everything is looked up in tables built once at import.
+###############################################################################
+ACTION_SIZE = 64 * 73
+
+QUEEN_DIRECTIONS = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]  # (rank, file) steps
+KNIGHT_JUMPS = [(2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)]
+UNDERPROMOTIONS = [chess.KNIGHT, chess.BISHOP, chess.ROOK]
+
+def _build_tables():
+    action_from = np.repeat(np.arange(64, dtype=np.int16), 73)
+    action_to = np.full(ACTION_SIZE, -1, dtype=np.int16)
+    action_promotion = np.zeros(ACTION_SIZE, dtype=np.int8)
+    move_to_action = np.full(64 * 64, -1, dtype=np.int32)  # from * 64 + to, without underpromotions
+
+    for square in range(64):
+        rank, file = divmod(square, 8)
+        base = 73 * square
+
+        steps = [(d * 7 + distance - 1, dr * distance, df * distance)
+                 for d, (dr, df) in enumerate(QUEEN_DIRECTIONS) for distance in range(1, 8)]
+        steps += [(56 + k, dr, df) for k, (dr, df) in enumerate(KNIGHT_JUMPS)]
+        for move_type, dr, df in steps:
+            if 0 <= rank + dr < 8 and 0 <= file + df < 8:
+                target = (rank + dr) * 8 + file + df
+                action_to[base + move_type] = target
+                move_to_action[square * 64 + target] = base + move_type
+
+        # Underpromotions start on the 7th rank for White, the 2nd for Black
+        if rank in (1, 6):
+            dr = 1 if rank == 6 else -1
+            for df in (-1, 0, 1):
+                if 0 <= file + df < 8:
+                    for p, piece in enumerate(UNDERPROMOTIONS):
+                        action = base + 64 + (df + 1) * 3 + p
+                        action_to[action] = (rank + dr) * 8 + file + df
+                        action_promotion[action] = piece
+
+    return action_from, action_to, action_promotion, move_to_action
+
+ACTION_FROM, ACTION_TO, ACTION_PROMOTION, MOVE_TO_ACTION = _build_tables()
+
+def encode_move(move):
+    """Action index of a move."""
+    if move.promotion and move.promotion != chess.QUEEN:
+        df = chess.square_file(move.to_square) - chess.square_file(move.from_square)
+        return 73 * move.from_square + 64 + (df + 1) * 3 + UNDERPROMOTIONS.index(move.promotion)
+    return int(MOVE_TO_ACTION[move.from_square * 64 + move.to_square])
+
+def decode_action(board, action):
+    """
+    The move an action stands for on this board, None if it does not fit on
+    the board. The move is not checked for legality.
+    """
+    to_square = int(ACTION_TO[action])
+    if to_square < 0:
+        return None
+
+    from_square = int(ACTION_FROM[action])
+    promotion = int(ACTION_PROMOTION[action]) or None
+    if promotion is None and board.piece_type_at(from_square) == chess.PAWN and chess.square_rank(to_square) in (0, 7):
+        promotion = chess.QUEEN
+    return chess.Move(from_square, to_square, promotion)
+
+def legal_actions(board):
+    """{action: move} of the legal moves, in python-chess's generation order."""
+    return {encode_move(move): move for move in board.legal_moves}
+
+def action_mask(actions, out=None):
+    """Boolean mask of length ACTION_SIZE with the given actions set."""
+    if out is None:
+        out = np.zeros(ACTION_SIZE, dtype=bool)
+    else:
+        out[:] = False
+    out[list(actions)] = True
+    return out
+
+def legal_action_mask(board, out=None):
+    return action_mask(legal_actions(board), out)
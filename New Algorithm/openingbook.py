@@ -0,0 +1,172 @@
+import io
+import sys
+import struct
+import argparse
+import chess
+import chess.pgn
+import chess.polyglot
+from collections import defaultdict
+from pgningest import RESULTS, GameFilter, open_pgn
+
+###############################################################################
+# Polyglot Opening Book
+###############################################################################
+# A book is a Polyglot .bin file: 16-byte big-endian entries
+#
+#   key u64 | move u16 | weight u16 | learn u32
+#
+# sorted by key, the polyglot Zobrist hash of the position. Any Polyglot
+# book works, and the books built here work in other programs. Reading
+# goes through python-chess's MemoryMappedReader, which maps the file and
+# binary searches it, so a lookup costs a few microseconds however large
+# the book is and opening it reads nothing up front. Most of a lookup is
+# hashing the board.
+###############################################################################
+ENTRY = struct.Struct(">QHHI")
+
+class OpeningBook:
+    """
+    Memory-mapped Polyglot book. pick() returns a book move for a board, or
+    None when the position is not in the book.
+    """
+    def __init__(self, path, minimum_weight=1):
+        self.path = path
+        self.minimum_weight = minimum_weight
+        self.reader = chess.polyglot.open_reader(path)
+
+    def __len__(self):
+        return len(self.reader)
+
+    def entries(self, board):
+        """
+        [(move, weight)] of the legal book moves of the position. Given the
+        board, find_all turns Polyglot's king takes rook into castling moves
+        and skips illegal ones (key collisions).
+        """
+        return [(entry.move, entry.weight) for entry in self.reader.find_all(board, minimum_weight=self.minimum_weight)]
+
+    def __contains__(self, board):
+        return self.pick(board) is not None
+
+    def pick(self, board, rng=None):
+        """
+        The highest weighted book move, or with rng a random one chosen in
+        proportion to the weights. None when out of book.
+        """
+        entries = self.entries(board)
+        if not entries:
+            return None
+        if rng is not None:
+            return rng.choices([move for move, weight in entries], weights=[weight for move, weight in entries])[0]
+        return max(entries, key=lambda entry: entry[1])[0]
+
+    def close(self):
+        self.reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def open_book(path, minimum_weight=1):
+    """The OpeningBook at path, None if there is no such file."""
+    try:
+        return OpeningBook(path, minimum_weight)
+    except FileNotFoundError:
+        return None
+
+###############################################################################
+# Building a Book
+###############################################################################
+# Counts how often each move was played from each position in the first
+# max_plies plies of a set of games, scored from the mover's side. The
+# weight of a move is 2 * wins + draws, as Polyglot's own book maker does,
+# so moves that only ever lost are left out.
+###############################################################################
+def polyglot_move(board, move):
+    """The 16-bit Polyglot encoding of a move, castling is king takes rook."""
+    to_square = move.to_square
+    if board.is_castling(move):
+        to_square = chess.square(7 if chess.square_file(move.to_square) > chess.square_file(move.from_square) else 0,
+                                 chess.square_rank(move.from_square))
+    promotion = move.promotion - 1 if move.promotion else 0
+    return (chess.square_file(to_square) | chess.square_rank(to_square) << 3
+            | chess.square_file(move.from_square) << 6 | chess.square_rank(move.from_square) << 9
+            | promotion << 12)
+
+class BookBuilder:
+    def __init__(self, max_plies=24):
+        self.max_plies = max_plies
+        self.games = 0
+        # (key, polyglot move) -> [games, wins, draws]
+        self.counts = defaultdict(lambda: [0, 0, 0])
+
+    def add_game(self, moves, outcome, board=None):
+        """outcome is +1, 0 or -1 from White's side, as in pgningest.RESULTS."""
+        board = board if board is not None else chess.Board()
+        for ply, move in enumerate(moves):
+            if ply >= self.max_plies:
+                break
+            count = self.counts[(chess.polyglot.zobrist_hash(board), polyglot_move(board, move))]
+            score = outcome if board.turn == chess.WHITE else -outcome
+            count[0] += 1
+            count[1] += score > 0
+            count[2] += score == 0
+            board.push(move)
+        self.games += 1
+
+    def entries(self, min_games=1):
+        """Sorted (key, move, weight) of the moves played at least min_games times."""
+        by_key = defaultdict(list)
+        for (key, move), (games, wins, draws) in self.counts.items():
+            weight = 2 * wins + draws
+            if games >= min_games and weight > 0:
+                by_key[key].append((move, weight))
+
+        entries = []
+        for key in sorted(by_key):
+            moves = sorted(by_key[key], key=lambda m: -m[1])
+            scale = max(1, -(-moves[0][1] // 0xFFFF))  # weights are 16 bits
+            entries.extend((key, move, max(1, weight // scale)) for move, weight in moves)
+        return entries
+
+    def write(self, path, min_games=1):
+        """Writes the Polyglot file and returns the number of entries."""
+        entries = self.entries(min_games)
+        with open(path, "wb") as handle:
+            for key, move, weight in entries:
+                handle.write(ENTRY.pack(key, move, weight, 0))
+        return len(entries)
+
+def build_book(pgn_path, book_path, game_filter=None, max_plies=24, min_games=2):
+    """Builds a book from the games of a PGN file that pass game_filter."""
+    game_filter = game_filter or GameFilter()
+    builder = BookBuilder(max_plies)
+
+    with io.TextIOWrapper(open_pgn(pgn_path), encoding="utf-8", errors="replace") as handle:
+        while True:
+            game = chess.pgn.read_game(handle)
+            if game is None:
+                break
+            if game.errors or not game_filter.accepts_headers(game.headers):
+                continue
+            builder.add_game(game.mainline_moves(), RESULTS[game.headers["Result"]], game.board())
+
+    return builder.games, builder.write(book_path, min_games)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a Polyglot opening book from a PGN file")
+    parser.add_argument("pgn", help=".pgn file, optionally .gz or .bz2 compressed")
+    parser.add_argument("book", help="Polyglot .bin file to write")
+    parser.add_argument("--max-plies", type=int, default=24, help="book depth in plies")
+    parser.add_argument("--min-games", type=int, default=2, help="leave out moves played fewer times")
+    parser.add_argument("--min-rating", type=int, default=None, help="both players rated at least this")
+    args = parser.parse_args(argv)
+
+    games, entries = build_book(args.pgn, args.book, GameFilter(args.min_rating), args.max_plies, args.min_games)
+    print(f"{games} games, {entries} book entries written to {args.book}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
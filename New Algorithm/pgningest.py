@@ -0,0 +1,229 @@
+import io
+import os
+import bz2
+import sys
+import gzip
+import time
+import argparse
+import chess
+import chess.pgn
+import numpy as np
+import multiprocessing as mp
+from collections import deque
+from encoder import board_masks, bitboards_from_masks
+from positiondataset import RECORD_DTYPE, SOURCE_PGN, PositionDatasetWriter
+
+###############################################################################
+# 1) Splitting the Input
+###############################################################################
+# The file is read line by line in this process and cut into chunks of
+# whole games of roughly chunk_bytes. A game starts at its [Event tag, or in
+# files without Event tags at the first tag line after a blank line, so the
+# chunks stay bounded either way. Only the raw bytes of a chunk travel to a
+# worker, the parsing happens there.
+###############################################################################
+RESULTS = {"1-0": 1.0, "0-1": -1.0, "1/2-1/2": 0.0}
+
+def open_pgn(path):
+    """Opens a .pgn, .pgn.gz or .pgn.bz2 file for reading bytes."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+def read_chunks(handle, chunk_bytes=1 << 20):
+    """Yields byte strings holding whole games, about chunk_bytes each."""
+    lines = []
+    size = 0
+    after_blank = False
+    for line in handle:
+        if size >= chunk_bytes and (line.startswith(b"[Event ") or (after_blank and line.startswith(b"["))):
+            yield b"".join(lines)
+            lines = []
+            size = 0
+        lines.append(line)
+        size += len(line)
+        after_blank = not line.strip()
+
+    if lines:
+        yield b"".join(lines)
+
+###############################################################################
+# 2) Parsing and Encoding (worker side)
+###############################################################################
+class GameFilter:
+    """
+    Which games to keep: both players rated within [min_rating, max_rating]
+    (games without ratings fail any rating limit) and a result in results.
+    """
+    def __init__(self, min_rating=None, max_rating=None, results=("1-0", "0-1", "1/2-1/2"), min_plies=1):
+        self.min_rating = min_rating
+        self.max_rating = max_rating
+        self.results = set(results)
+        self.min_plies = min_plies
+
+    def accepts_headers(self, headers):
+        result = headers.get("Result")
+        if result not in RESULTS or result not in self.results:
+            return False
+        if self.min_rating is None and self.max_rating is None:
+            return True
+
+        for tag in ("WhiteElo", "BlackElo"):
+            try:
+                rating = int(headers.get(tag, ""))
+            except ValueError:
+                return False
+            if self.min_rating is not None and rating < self.min_rating:
+                return False
+            if self.max_rating is not None and rating > self.max_rating:
+                return False
+        return True
+
+def parse_chunk(task):
+    """
+    Parses the games of one chunk and encodes the positions of those that
+    pass the filter. Returns (records, games_read, games_kept, n_bytes),
+    with games numbered from 0 within the chunk.
+    """
+    data, game_filter = task
+    handle = io.StringIO(data.decode("utf-8", errors="replace"))
+
+    masks, outcomes, games, plies, turns = [], [], [], [], []
+    games_read = games_kept = 0
+
+    while True:
+        # Headers first, the moves of rejected games are skipped unparsed
+        offset = handle.tell()
+        headers = chess.pgn.read_headers(handle)
+        if headers is None:
+            break
+        games_read += 1
+        if not game_filter.accepts_headers(headers):
+            continue
+
+        handle.seek(offset)
+        game = chess.pgn.read_game(handle)
+        if game is None or game.errors:
+            continue
+
+        board = game.board()
+        start = len(masks)
+        for move in game.mainline_moves():
+            masks.append(board_masks(board))
+            turns.append(board.turn)
+            board.push(move)
+
+        n = len(masks) - start
+        if n < game_filter.min_plies:
+            del masks[start:], turns[start:]
+            continue
+
+        outcomes.extend([RESULTS[headers["Result"]]] * n)
+        games.extend([games_kept] * n)
+        plies.extend(range(n))
+        games_kept += 1
+
+    records = np.zeros(len(masks), dtype=RECORD_DTYPE)
+    if len(masks):
+        records["bitboards"] = bitboards_from_masks(masks)
+        records["outcome"] = outcomes
+        records["game"] = games
+        records["ply"] = plies
+        records["turn"] = turns
+        records["flags"] = SOURCE_PGN
+
+    return records, games_read, games_kept, len(data)
+
+###############################################################################
+# 3) Ingestion
+###############################################################################
+class IngestStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.games_read = 0
+        self.games_kept = 0
+        self.positions = 0
+        self.bytes = 0
+
+    def add(self, records, games_read, games_kept, n_bytes):
+        self.games_read += games_read
+        self.games_kept += games_kept
+        self.positions += len(records)
+        self.bytes += n_bytes
+
+    def rates(self):
+        elapsed = time.perf_counter() - self.start
+        return {
+            "games_read": self.games_read,
+            "games_kept": self.games_kept,
+            "positions": self.positions,
+            "bytes": self.bytes,
+            "seconds": elapsed,
+            "games_per_second": self.games_read / elapsed if elapsed else 0.0,
+            "bytes_per_second": self.bytes / elapsed if elapsed else 0.0,
+        }
+
+def print_progress(rates):
+    print(f"{rates['games_read']:>10} games read  {rates['games_kept']:>10} kept  {rates['positions']:>12} positions  "
+          f"{rates['games_per_second']:>8.0f} games/s  {rates['bytes_per_second'] / 2**20:>6.2f} MB/s")
+
+def ingest_pgn(pgn_path, dataset_path, game_filter=None, workers=None, chunk_bytes=1 << 20,
+               max_pending=None, report=print_progress, report_every=10.0):
+    """
+    Streams a PGN file into a position dataset. At most max_pending chunks
+    (2 per worker by default) are read ahead or waiting to be written, so
+    memory does not grow with the size of the file. Chunks are written in
+    file order. Returns the final IngestStats.rates().
+    """
+    game_filter = game_filter or GameFilter()
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    stats = IngestStats()
+    last_report = time.perf_counter()
+
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(workers) as pool, open_pgn(pgn_path) as handle, PositionDatasetWriter(dataset_path, flags=SOURCE_PGN) as writer:
+        pending = deque()
+        chunks = read_chunks(handle, chunk_bytes)
+
+        while True:
+            for chunk in chunks:
+                pending.append(pool.apply_async(parse_chunk, ((chunk, game_filter),)))
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+
+            records, games_read, games_kept, n_bytes = pending.popleft().get()
+            writer.add_games(records, games_kept)
+            stats.add(records, games_read, games_kept, n_bytes)
+
+            if report is not None and time.perf_counter() - last_report >= report_every:
+                report(stats.rates())
+                last_report = time.perf_counter()
+
+    rates = stats.rates()
+    if report is not None:
+        report(rates)
+    return rates
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encode the positions of a PGN file into a position dataset")
+    parser.add_argument("pgn", help=".pgn file, optionally .gz or .bz2 compressed")
+    parser.add_argument("dataset", help="dataset directory, created or appended to")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes, one per CPU by default")
+    parser.add_argument("--min-rating", type=int, default=None, help="both players rated at least this")
+    parser.add_argument("--max-rating", type=int, default=None, help="both players rated at most this")
+    parser.add_argument("--results", default="1-0,0-1,1/2-1/2", help="comma separated results to keep")
+    parser.add_argument("--min-plies", type=int, default=1, help="skip games shorter than this")
+    parser.add_argument("--chunk-kb", type=int, default=1024, help="size of the pieces handed to the workers")
+    args = parser.parse_args(argv)
+
+    game_filter = GameFilter(args.min_rating, args.max_rating, args.results.split(","), args.min_plies)
+    ingest_pgn(args.pgn, args.dataset, game_filter, args.workers, args.chunk_kb * 1024)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
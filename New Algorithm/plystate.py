@@ -0,0 +1,51 @@
+import chess
+from movecodec import legal_actions
+
+###############################################################################
+# Per-Ply State Cache
+###############################################################################
+# is_checkmate, is_stalemate and is_game_over each generate the legal
+# moves again, and the next step generates them once more to pick its move.
+# PlyState generates them once right after a move and derives everything
+# else from that list: the termination, the reward and the done flag, and
+# what the next step chooses from.
+###############################################################################
+
+class PlyState:
+    """
+    Legal moves and outcome of the board's current position. Build a new one
+    after every push, it does not follow the board.
+    with_actions also keys the moves by their movecodec action.
+    """
+    def __init__(self, board, with_actions=False):
+        self.turn = board.turn
+        if with_actions:
+            self.legal_actions = legal_actions(board)
+            self.legal_moves = list(self.legal_actions.values())
+        else:
+            self.legal_actions = None
+            self.legal_moves = list(board.legal_moves)
+
+        # Same checks and order as board.outcome(), minus the move generation
+        if not self.legal_moves:
+            self.termination = chess.Termination.CHECKMATE if board.is_check() else chess.Termination.STALEMATE
+        elif board.is_insufficient_material():
+            self.termination = chess.Termination.INSUFFICIENT_MATERIAL
+        elif board.is_seventyfive_moves():
+            self.termination = chess.Termination.SEVENTYFIVE_MOVES
+        elif board.is_fivefold_repetition():
+            self.termination = chess.Termination.FIVEFOLD_REPETITION
+        else:
+            self.termination = None
+
+    @property
+    def done(self):
+        return self.termination is not None
+
+    def reward(self):
+        """Reward system: Win = +1, Loss = -1, Draw = 0, small -0.01 per move"""
+        if self.termination == chess.Termination.CHECKMATE:
+            return 1 if self.turn == chess.BLACK else -1
+        if self.termination in (chess.Termination.STALEMATE, chess.Termination.INSUFFICIENT_MATERIAL):
+            return 0  # Draw
+        return -0.01  # Small penalty to encourage faster wins
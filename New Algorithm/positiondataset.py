@@ -0,0 +1,181 @@
+import os
+import json
+import numpy as np
+from encoder import board_bitboards, planes_from_bitboards
+
+###############################################################################
+# 1) On-Disk Format
+###############################################################################
+# A dataset is a directory of shard files plus a small meta.json:
+#
+#   meta.json          format version, record layout and shard size
+#   shard-00000.bin    fixed-size records, appended to and never rewritten
+#   shard-00001.bin    ...
+#
+# Each record is one position: its 12 piece bitboards (the 768 bits the
+# network sees, see encoder.py), the game outcome from White's perspective
+# and some metadata. The record count of a shard is its file size divided
+# by the record size, so there is no index to keep in sync, and a record
+# cut short by a crash is simply ignored.
+#
+# Shards are opened with np.memmap, only the pages actually read are
+# loaded, so the dataset can be far larger than RAM.
+# The training loader that streams it into torch is in positionstream.py.
+###############################################################################
+FORMAT_VERSION = 1
+
+RECORD_DTYPE = np.dtype([
+    ("bitboards", "<u8", (12,)),
+    ("outcome", "<f4"),   # +1 White won, -1 Black won, 0 draw
+    ("game", "<u4"),      # game number within the dataset
+    ("ply", "<u2"),       # half moves played before this position
+    ("turn", "u1"),       # 1 when White is to move
+    ("flags", "u1"),      # free for the producer, e.g. where the game came from
+])
+
+# Values of the flags field
+SOURCE_SELF_PLAY = 0
+SOURCE_PGN = 1
+
+def shard_name(index):
+    return f"shard-{index:05d}.bin"
+
+def read_meta(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta["version"] != FORMAT_VERSION or meta["record_size"] != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} position dataset")
+    return meta
+
+def shard_paths(path):
+    return sorted(os.path.join(path, name) for name in os.listdir(path) if name.startswith("shard-") and name.endswith(".bin"))
+
+def open_shard(shard_path):
+    """Read-only memory map of the complete records in a shard."""
+    count = os.path.getsize(shard_path) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(shard_path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+
+###############################################################################
+# 2) Writer
+###############################################################################
+class PositionDatasetWriter:
+    """
+    Appends positions to a dataset directory, creating it if needed.
+    Records are buffered and written in blocks, call close() (or use it as a
+    context manager) to write the rest. Only one writer per dataset.
+    """
+    def __init__(self, path, shard_size=1_000_000, flush_size=65536, flags=0):
+        self.path = path
+        self.flags = flags
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            self.shard_size = read_meta(path)["shard_size"]
+        else:
+            self.shard_size = shard_size
+            with open(meta_path, "w") as f:
+                json.dump({"version": FORMAT_VERSION, "record_size": RECORD_DTYPE.itemsize,
+                           "fields": RECORD_DTYPE.names, "shard_size": shard_size}, f)
+
+        self.pending = np.zeros(flush_size, dtype=RECORD_DTYPE)
+        self.pending_count = 0
+
+        # Carry on after the last complete record of the last shard
+        shards = shard_paths(path)
+        self.shard_index = len(shards) - 1 if shards else 0
+        self.shard_count = 0
+        self.next_game = 0
+        if shards:
+            size = os.path.getsize(shards[-1])
+            self.shard_count = size // RECORD_DTYPE.itemsize
+            if size != self.shard_count * RECORD_DTYPE.itemsize:
+                # Drop a record left half written by a crash
+                os.truncate(shards[-1], self.shard_count * RECORD_DTYPE.itemsize)
+            if self.shard_count:
+                offset = (self.shard_count - 1) * RECORD_DTYPE.itemsize
+                self.next_game = int(np.fromfile(shards[-1], dtype=RECORD_DTYPE, count=1, offset=offset)["game"][0]) + 1
+
+    def add_game(self, boards, outcome, first_ply=0):
+        """Adds every position of one game, returns the game number."""
+        game = self.next_game
+        self.next_game += 1
+
+        n = len(boards)
+        records = np.zeros(n, dtype=RECORD_DTYPE)
+        records["bitboards"] = board_bitboards(boards)
+        records["outcome"] = outcome
+        records["game"] = game
+        records["ply"] = np.arange(first_ply, first_ply + n)
+        records["turn"] = [board.turn for board in boards]
+        records["flags"] = self.flags
+        self.add_records(records)
+        return game
+
+    def add_games(self, records, n_games):
+        """
+        Adds records of n_games consecutive games numbered from 0, as built
+        by another process, and renumbers them after the games already in.
+        """
+        records["game"] += self.next_game
+        self.next_game += n_games
+        self.add_records(records)
+
+    def add_records(self, records):
+        while len(records):
+            space = len(self.pending) - self.pending_count
+            take = records[:space]
+            self.pending[self.pending_count:self.pending_count + len(take)] = take
+            self.pending_count += len(take)
+            records = records[len(take):]
+            if self.pending_count == len(self.pending):
+                self.flush()
+
+    def flush(self):
+        start = 0
+        while start < self.pending_count:
+            if self.shard_count == self.shard_size:
+                self.shard_index += 1
+                self.shard_count = 0
+
+            take = min(self.pending_count - start, self.shard_size - self.shard_count)
+            with open(os.path.join(self.path, shard_name(self.shard_index)), "ab") as f:
+                f.write(self.pending[start:start + take].tobytes())
+            self.shard_count += take
+            start += take
+
+        self.pending_count = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+###############################################################################
+# 3) Reader
+###############################################################################
+class PositionDataset:
+    """
+    Memory-mapped view of all shards of a dataset.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.meta = read_meta(path)
+        self.shards = [shard for shard in map(open_shard, shard_paths(path)) if len(shard)]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+    def nbytes(self):
+        return len(self) * RECORD_DTYPE.itemsize
+
+def decode_records(records, out=None):
+    """([N, 768] float32 planes, [N, 1] float32 outcomes) of a record array."""
+    planes = planes_from_bitboards(records["bitboards"], out if out is not None else np.empty((len(records), 768), dtype=np.float32))
+    return planes, records["outcome"].astype(np.float32).reshape(-1, 1)
@@ -0,0 +1,50 @@
+import numpy as np
+from torch.utils.data import IterableDataset, get_worker_info
+from positiondataset import PositionDataset, decode_records
+
+###############################################################################
+# Streaming Loader
+###############################################################################
+class ShardedPositionStream(IterableDataset):
+    """
+    Streams shuffled batches of (planes, outcomes) from a dataset.
+
+    Shards are split into blocks of block_size consecutive records. Every
+    pass shuffles the blocks of all shards together, then reads them
+    mix_blocks at a time (so one group draws from many shards), shuffles the
+    records of the group and cuts it into batches. Reads stay sequential
+    within a block and memory is bounded by one group.
+
+    Use with DataLoader(stream, batch_size=None), every item already is a
+    batch. With several DataLoader workers each takes its own blocks.
+    """
+    def __init__(self, path, batch_size=256, block_size=4096, mix_blocks=16, epochs=1, seed=0):
+        self.path = path
+        self.batch_size = batch_size
+        self.block_size = block_size
+        self.mix_blocks = mix_blocks
+        self.epochs = epochs
+        self.seed = seed
+
+    def blocks(self, shards):
+        return [(s, start) for s, shard in enumerate(shards) for start in range(0, len(shard), self.block_size)]
+
+    def __iter__(self):
+        dataset = PositionDataset(self.path)
+        shards = dataset.shards
+        blocks = self.blocks(shards)
+
+        worker = get_worker_info()
+        worker_id, workers = (worker.id, worker.num_workers) if worker is not None else (0, 1)
+
+        for epoch in range(self.epochs):
+            rng = np.random.default_rng((self.seed, epoch))
+            order = rng.permutation(len(blocks))[worker_id::workers]
+
+            for group_start in range(0, len(order), self.mix_blocks):
+                group = [blocks[i] for i in order[group_start:group_start + self.mix_blocks]]
+                records = np.concatenate([shards[s][start:start + self.block_size] for s, start in group])
+                records = records[rng.permutation(len(records))]
+
+                for batch_start in range(0, len(records), self.batch_size):
+                    yield decode_records(records[batch_start:batch_start + self.batch_size])
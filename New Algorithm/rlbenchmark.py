@@ -0,0 +1,469 @@
+import os
+import sys
+import time
+import tempfile
+import cProfile
+import pstats
+import random
+import chess
+import numpy as np
+from stable_baselines3 import PPO
+from functools import partial
+from stable_baselines3.common.vec_env import DummyVecEnv, VecMonitor
+from rlbuilder import ChessEnv, MaskablePPO, batched_alpha_beta_search, ppo_select_move
+from encoder import BoardEncoder, encode_board
+from selfplay import SelfPlayStats, generate_games
+from rlmodel import ReplayBuffer
+from collections import deque
+from vecenv import ChessVecEnv
+from movecodec import action_mask, legal_actions
+from openingbook import BookBuilder, OpeningBook
+from tablebase import Tablebase
+
+###############################################################################
+# Positions used by the benchmarks
+###############################################################################
+BENCHMARK_FENS = {
+    "start": chess.STARTING_FEN,
+    "italian": "r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    "middlegame": "r2q1rk1/pp2bppp/2n1pn2/3p4/3P1B2/2PB1N2/PP1N1PPP/R2Q1RK1 w - - 3 10",
+}
+
+def load_model(path="ppo_chess_strong"):
+    """
+    Loads the trained model, or builds an untrained one of the same shape.
+    Timings do not depend on the weights.
+    """
+    try:
+        return PPO.load(path)
+    except Exception:
+        return PPO("MlpPolicy", ChessEnv())
+
+###############################################################################
+# Leaf batching in rlbuilder.alpha_beta_search
+###############################################################################
+def benchmark_leaf_batching(model=None, depth=3, batch_sizes=(1, 32, 256, 1024)):
+    """
+    Leaves per second of the minimax search, one forward pass per leaf
+    against batched leaf evaluation at several batch sizes.
+    """
+    model = model or load_model()
+    # prefetch depth 1 batches the children of each frontier node, depth 2
+    # queues whole subtrees and fills larger batches at the cost of
+    # evaluating leaves that alpha-beta would have cut
+    settings = [("per leaf", 1, 0), ("frontier", 256, 1)] + [(f"batch {size}", size, 2) for size in batch_sizes]
+
+    print(f"{'position':<12} {'mode':<12} {'leaves':>8} {'batches':>8} {'seconds':>8} {'leaves/s':>10}  best move")
+    for name, fen in BENCHMARK_FENS.items():
+        for label, batch_size, prefetch_depth in settings:
+            board = chess.Board(fen)
+            start = time.perf_counter()
+            value, move, batcher = batched_alpha_beta_search(board, depth, board.turn == chess.WHITE, model, batch_size, prefetch_depth)
+            elapsed = time.perf_counter() - start
+
+            print(f"{name:<12} {label:<12} {batcher.leaves:>8} {batcher.batches:>8} {elapsed:>8.2f} {batcher.leaves / elapsed:>10.0f}  {move} ({value:.3f})")
+
+###############################################################################
+# Tablebase probing in the search
+###############################################################################
+ENDGAME_FENS = {
+    "kpk": "8/8/8/8/3k4/8/3P4/3K4 w - - 0 1",
+    "krk": "8/8/2k5/8/8/8/1R6/4K3 w - - 0 1",
+    "kq-kr": "8/8/8/4k3/8/2r5/3Q4/4K3 w - - 0 1",
+    "kr-kp": "8/8/8/2k5/8/5p2/1R6/6K1 w - - 0 1",
+}
+
+class CountingBoard(chess.Board):
+    """A board counting the positions it visits, copies share the count."""
+    pushes = 0
+
+    def push(self, move):
+        CountingBoard.pushes += 1
+        super().push(move)
+
+def benchmark_tablebase(model=None, depth=3, syzygy_path=None):
+    """
+    Positions visited and leaves sent to the network by the batched search
+    on endgames, with and without tablebase probing.
+    """
+    model = model or load_model()
+    tablebase = Tablebase(syzygy_path)
+
+    print(f"{'position':<10} {'probing':<8} {'nodes':>8} {'leaves':>7} {'tb hits':>8} {'seconds':>8}  best move")
+    for name, fen in ENDGAME_FENS.items():
+        for probing in (None, tablebase):
+            board = CountingBoard(fen)
+            CountingBoard.pushes = 0
+            hits = tablebase.hits
+
+            start = time.perf_counter()
+            value, move, batcher = batched_alpha_beta_search(board, depth, board.turn == chess.WHITE, model, tablebase=probing)
+            elapsed = time.perf_counter() - start
+
+            label = "on" if probing is not None else "off"
+            print(f"{name:<10} {label:<8} {CountingBoard.pushes:>8} {batcher.leaves:>7} {tablebase.hits - hits:>8} {elapsed:>8.2f}  {move} ({value:.3f})")
+
+CONVERSION_FENS = {
+    "krk mate in 1": "7k/8/6K1/8/8/8/8/R7 w - - 0 1",
+    "krk": ENDGAME_FENS["krk"],
+    "kqk": "8/8/8/3k4/8/8/8/Q3K3 w - - 0 1",
+    "kpk": "4k3/8/4K3/4P3/8/8/8/8 w - - 0 1",
+}
+
+def check_tablebase_conversion(model=None, depth=2, max_plies=150):
+    """
+    Plays won endgames out with the tablebase on both sides and checks the
+    winning side mates, with the plies it took.
+    """
+    model = model or load_model()
+    tablebase = Tablebase()
+    for name, fen in CONVERSION_FENS.items():
+        board = chess.Board(fen)
+        while not board.is_game_over() and len(board.move_stack) < max_plies:
+            _, move, _ = batched_alpha_beta_search(board, depth, board.turn == chess.WHITE, model, tablebase=tablebase)
+            board.push(move)
+
+        assert board.is_checkmate(), f"{name}: {board.result(claim_draw=True)} after {len(board.move_stack)} plies, {board.fen()}"
+        print(f"{name:<14} mate in {len(board.move_stack)} plies")
+
+###############################################################################
+# Opening book against PPO move selection
+###############################################################################
+def benchmark_opening_book(book_path=None, model=None, count=1000, seed=0):
+    """
+    Microseconds per opening move from the Polyglot book against a PPO
+    forward pass. Without book_path a book is built from count random
+    games of up to 16 plies, so every benchmark position is in it.
+    """
+    model = model or load_model()
+    boards = random_boards(count, max_plies=16, seed=seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if book_path is None:
+            builder = BookBuilder(max_plies=16)
+            for board in boards:
+                builder.add_game(board.move_stack, 0.0)
+            book_path = os.path.join(directory, "book.bin")
+            builder.write(book_path)
+
+        # Positions before the last move of each game
+        positions = []
+        for board in boards:
+            if board.move_stack:
+                position = board.copy()
+                position.pop()
+                positions.append(position)
+
+        print(f"{'selector':<8} {'moves':>6} {'in book':>8} {'us/move':>9}")
+        with OpeningBook(book_path) as book:
+            start = time.perf_counter()
+            found = sum(book.pick(board) is not None for board in positions)
+            elapsed = time.perf_counter() - start
+            print(f"{'book':<8} {len(positions):>6} {found:>8} {1e6 * elapsed / len(positions):>9.1f}")
+
+        start = time.perf_counter()
+        for board in positions:
+            ppo_select_move(board, model)
+        elapsed = time.perf_counter() - start
+        print(f"{'ppo':<8} {len(positions):>6} {'':>8} {1e6 * elapsed / len(positions):>9.1f}")
+
+###############################################################################
+# Board encoding
+###############################################################################
+def legacy_board_to_planes(board):
+    """
+    The per-square loop board_to_planes used before encoder.py, kept as the baseline.
+    """
+    planes = np.zeros((8, 8, 12), dtype=np.float32)
+    piece_map = {
+        "P": 0, "N": 1, "B": 2, "R": 3, "Q": 4, "K": 5,
+        "p": 6, "n": 7, "b": 8, "r": 9, "q": 10, "k": 11
+    }
+    for square in range(64):
+        piece = board.piece_at(square)
+        if piece:
+            row, col = divmod(square, 8)
+            planes[row, col, piece_map[piece.symbol()]] = 1
+    return planes
+
+def random_boards(count, max_plies=80, seed=0):
+    """
+    Positions from random games, for benchmarks that need many boards.
+    """
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = chess.Board()
+        for _ in range(rng.randrange(max_plies)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        boards.append(board)
+    return boards
+
+def benchmark_encoder(count=4096, batch_sizes=(1, 64, 1024)):
+    """
+    Boards per second of the per-square loop against the bitboard encoder,
+    one board at a time and in preallocated batches.
+    """
+    boards = random_boards(count)
+
+    start = time.perf_counter()
+    expected = np.stack([legacy_board_to_planes(board) for board in boards])
+    baseline = time.perf_counter() - start
+    print(f"{'encoder':<16} {'boards/s':>10} {'speedup':>8}")
+    print(f"{'per-square loop':<16} {count / baseline:>10.0f} {1.0:>7.2f}x")
+
+    start = time.perf_counter()
+    single = np.stack([encode_board(board) for board in boards])
+    elapsed = time.perf_counter() - start
+    if not np.array_equal(single, expected):
+        raise AssertionError("encode_board does not match the per-square loop")
+    print(f"{'encode_board':<16} {count / elapsed:>10.0f} {baseline / elapsed:>7.2f}x")
+
+    for batch_size in batch_sizes:
+        encoder = BoardEncoder(batch_size)
+        start = time.perf_counter()
+        for i in range(0, count, batch_size):
+            planes = encoder.encode(boards[i:i + batch_size])
+            if not np.array_equal(planes, expected[i:i + batch_size]):
+                raise AssertionError(f"batch of {batch_size} does not match the per-square loop")
+        elapsed = time.perf_counter() - start
+        print(f"{'batch ' + str(batch_size):<16} {count / elapsed:>10.0f} {baseline / elapsed:>7.2f}x")
+
+###############################################################################
+# Self-play game generation
+###############################################################################
+def benchmark_self_play(n_games=200, worker_counts=(0, 1, 2, 4, 8)):
+    """
+    Games and positions per second of random self-play by worker count,
+    0 being the single process loop train_value_network used to run.
+    """
+    print(f"{'workers':>7} {'games':>6} {'positions':>10} {'seconds':>8} {'games/s':>8} {'positions/s':>12}")
+    for workers in worker_counts:
+        stats = SelfPlayStats()
+        for states, outcome in generate_games(n_games, workers, seed=0):
+            stats.add(states)
+        rates = stats.rates()
+        print(f"{workers:>7} {rates['games']:>6} {rates['positions']:>10} {rates['seconds']:>8.2f} "
+              f"{rates['games_per_second']:>8.1f} {rates['positions_per_second']:>12.0f}")
+
+###############################################################################
+# Replay buffer
+###############################################################################
+class LegacyReplayBuffer:
+    """
+    The FEN string deque rlmodel.ReplayBuffer used to be, kept as the baseline.
+    """
+    def __init__(self, max_size=10000):
+        self.buffer = deque(maxlen=max_size)
+
+    def push(self, state, value):
+        self.buffer.append((state, value))
+
+    def sample(self, batch_size=32):
+        mini_batch = random.sample(self.buffer, min(batch_size, len(self.buffer)))
+        return [s for s, v in mini_batch], [v for s, v in mini_batch]
+
+    def memory_bytes(self):
+        # The deque's own blocks are left out, this only undercounts the baseline
+        return sum(sys.getsizeof(entry) + sys.getsizeof(entry[0]) + sys.getsizeof(entry[1]) for entry in self.buffer)
+
+def benchmark_replay_buffer(positions=20000, batch_size=64, samples=500):
+    """
+    Memory and samples per second (encoded batches ready for the network) of
+    the FEN deque against the bit-packed ring buffer.
+    """
+    boards = random_boards(positions)
+    values = [random.choice((-1.0, 0.0, 1.0)) for _ in boards]
+
+    legacy = LegacyReplayBuffer(positions)
+    for board, value in zip(boards, values):
+        legacy.push(board.fen(), value)
+    encoder = BoardEncoder(batch_size, flat=True)
+
+    start = time.perf_counter()
+    for _ in range(samples):
+        fens, targets = legacy.sample(batch_size)
+        planes = encoder.encode([chess.Board(fen=fen) for fen in fens])
+        targets = np.asarray(targets, dtype=np.float32)
+    legacy_seconds = time.perf_counter() - start
+
+    buffer = ReplayBuffer(positions, seed=0)
+    buffer.extend(boards, values)
+
+    start = time.perf_counter()
+    for _ in range(samples):
+        planes, targets = buffer.sample_arrays(batch_size)
+    seconds = time.perf_counter() - start
+
+    print(f"{'buffer':<12} {'positions':>9} {'MB':>7} {'samples/s':>10}")
+    print(f"{'fen deque':<12} {len(legacy.buffer):>9} {legacy.memory_bytes() / 2**20:>7.2f} {samples * batch_size / legacy_seconds:>10.0f}")
+    print(f"{'ring buffer':<12} {len(buffer):>9} {buffer.memory_bytes() / 2**20:>7.2f} {samples * batch_size / seconds:>10.0f}")
+
+###############################################################################
+# Vectorized environments
+###############################################################################
+def benchmark_vec_env(env_counts=(1, 2, 4, 8, 16), steps=300, n_workers=None):
+    """
+    Environment steps per second of ChessVecEnv as the number of
+    environments grows, against SB3's DummyVecEnv stepping independent
+    ChessEnvs one after another in this process.
+    """
+    print(f"{'vec env':<12} {'envs':>5} {'steps/s':>9}")
+    for n_envs in env_counts:
+        for label, make in (("dummy", lambda: DummyVecEnv([ChessEnv] * n_envs)),
+                            ("subprocess", lambda: ChessVecEnv(ChessEnv, n_envs, n_workers))):
+            vec_env = make()
+            vec_env.reset()
+            rng = np.random.default_rng(0)
+
+            start = time.perf_counter()
+            for _ in range(steps):
+                vec_env.step(rng.integers(0, 4672, n_envs))
+            elapsed = time.perf_counter() - start
+            vec_env.close()
+
+            print(f"{label:<12} {n_envs:>5} {n_envs * steps / elapsed:>9.0f}")
+
+###############################################################################
+# Action schemes
+###############################################################################
+def benchmark_action_schemes(steps=5000, seed=0):
+    """
+    Steps per second of ChessEnv with the modulo scheme against the move
+    codec, both playing random legal moves. The codec steps include
+    building the legal-action mask.
+    """
+    rng = np.random.default_rng(seed)
+    print(f"{'scheme':<8} {'steps/s':>9}")
+    for scheme in ("modulo", "codec"):
+        env = ChessEnv(action_scheme=scheme)
+        env.reset()
+
+        start = time.perf_counter()
+        for _ in range(steps):
+            if scheme == "codec":
+                action = rng.choice(np.flatnonzero(env.action_masks()))
+            else:
+                action = rng.integers(0, 4672)
+            obs, reward, done, info = env.step(action)
+            if done:
+                env.reset()
+        elapsed = time.perf_counter() - start
+
+        print(f"{scheme:<8} {steps / elapsed:>9.0f}")
+
+###############################################################################
+# Terminal-state checks per step
+###############################################################################
+class LegacyChessEnv(ChessEnv):
+    """
+    ChessEnv.play as it was before PlyState: after the push the legal moves
+    are generated for the mask, then again by is_checkmate, is_stalemate and
+    is_game_over.
+    """
+    def _update_state(self):
+        self.legal_actions = legal_actions(self.board)
+        action_mask(self.legal_actions, self.mask)
+
+    def play(self, action):
+        if len(self.legal_actions) == 0:
+            return -1, True, {}
+
+        info = {}
+        move = self.legal_actions.get(int(action)) if self.action_scheme == "codec" else None
+        if move is None:
+            legal_moves = list(self.legal_actions.values())
+            move = legal_moves[action % len(legal_moves)]
+            if self.action_scheme == "codec":
+                info["illegal_action"] = True
+        self.board.push(move)
+        self._update_state()
+
+        if self.board.is_checkmate():
+            reward = 1 if self.board.turn == chess.BLACK else -1
+        elif self.board.is_stalemate() or self.board.is_insufficient_material():
+            reward = 0
+        else:
+            reward = -0.01
+
+        done = self.board.is_game_over()
+        return reward, done, info
+
+def run_env_steps(env, steps, seed=0):
+    """Plays steps random actions, resetting on done. Returns the (reward, done) of every step."""
+    rng = np.random.default_rng(seed)
+    env.reset()
+    trace = []
+    for _ in range(steps):
+        reward, done, info = env.play(rng.integers(0, 4672))
+        trace.append((reward, done))
+        if done:
+            env.reset()
+    return trace
+
+def benchmark_env_step(steps=20000, seed=0, profile=False):
+    """
+    Per-step cost of ChessEnv.play with the PlyState cache against the
+    legacy terminal checks, on the same random games (the modulo scheme,
+    so both play identical moves). The observation is left out, it is the
+    same for both. profile=True also prints where the time goes.
+    """
+    print(f"{'env':<8} {'steps':>6} {'us/step':>8} {'steps/s':>9}")
+    traces = {}
+    for label, env_class in (("legacy", LegacyChessEnv), ("cached", ChessEnv)):
+        env = env_class(action_scheme="modulo")
+        start = time.perf_counter()
+        traces[label] = run_env_steps(env, steps, seed)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<8} {steps:>6} {1e6 * elapsed / steps:>8.1f} {steps / elapsed:>9.0f}")
+
+        if profile:
+            profiler = cProfile.Profile()
+            profiler.runcall(run_env_steps, env, steps, seed)
+            pstats.Stats(profiler).sort_stats("tottime").print_stats(8)
+
+    # Same games, same rewards and dones
+    assert traces["legacy"] == traces["cached"]
+
+def benchmark_sample_efficiency(timesteps=50000, n_envs=8, seed=0):
+    """
+    Trains PPO on the modulo scheme and masked PPO on the codec for the same
+    number of environment steps and compares the episodes they end up
+    playing. Needs sb3_contrib for the masked run.
+    """
+    runs = [("modulo", PPO)]
+    if MaskablePPO is not None:
+        runs.append(("codec", MaskablePPO))
+    else:
+        print("sb3_contrib is not installed, skipping the masked codec run")
+
+    print(f"{'scheme':<8} {'timesteps':>9} {'seconds':>8} {'steps/s':>8} {'ep reward':>10} {'ep length':>10}")
+    for scheme, algorithm in runs:
+        vec_env = VecMonitor(ChessVecEnv(partial(ChessEnv, action_scheme=scheme), n_envs))
+        model = algorithm("MlpPolicy", vec_env, seed=seed, verbose=0)
+
+        start = time.perf_counter()
+        model.learn(total_timesteps=timesteps)
+        elapsed = time.perf_counter() - start
+        vec_env.close()
+
+        episodes = list(model.ep_info_buffer)
+        reward = np.mean([episode["r"] for episode in episodes]) if episodes else float("nan")
+        length = np.mean([episode["l"] for episode in episodes]) if episodes else float("nan")
+        print(f"{scheme:<8} {timesteps:>9} {elapsed:>8.1f} {timesteps / elapsed:>8.0f} {reward:>10.3f} {length:>10.1f}")
+
+if __name__ == "__main__":
+    benchmark_encoder()
+    benchmark_leaf_batching()
+    benchmark_opening_book()
+    benchmark_tablebase()
+    check_tablebase_conversion()
+    benchmark_self_play()
+    benchmark_replay_buffer()
+    benchmark_vec_env()
+    benchmark_action_schemes()
+    benchmark_env_step()
+    benchmark_sample_efficiency()
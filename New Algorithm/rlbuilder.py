@@ -1,4 +1,7 @@
+import time
+from functools import partial
 import chess
+import chess.polyglot
 import numpy as np
 import gym
 from gym import spaces
@@ -6,7 +9,17 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 from stable_baselines3 import PPO
-from stable_baselines3.common.env_util import make_vec_env
+from encoder import encode_board, encode_boards
+from vecenv import ChessVecEnv
+from movecodec import ACTION_SIZE, action_mask, legal_actions
+from plystate import PlyState
+from openingbook import open_book
+from tablebase import Tablebase
+
+try:
+    from sb3_contrib import MaskablePPO
+except ImportError:
+    MaskablePPO = None
 
 ###############################################################################
 # 1) Board Representation (CNN Input)
@@ -16,18 +29,9 @@ def board_to_planes(board):
     Converts a chess board into an 8x8x12 tensor representation.
     - 12 channels for piece types (6 for white, 6 for black).
     - Each square is either 1 (occupied) or 0 (empty).
+    See encoder.py for the layout.
     """
-    planes = np.zeros((8, 8, 12), dtype=np.float32)
-    piece_map = {
-        "P": 0, "N": 1, "B": 2, "R": 3, "Q": 4, "K": 5,
-        "p": 6, "n": 7, "b": 8, "r": 9, "q": 10, "k": 11
-    }
-    for square in range(64):
-        piece = board.piece_at(square)
-        if piece:
-            row, col = divmod(square, 8)
-            planes[row, col, piece_map[piece.symbol()]] = 1
-    return planes
+    return encode_board(board)
 
 ###############################################################################
 # 2) Custom Chess Environment for PPO Training
@@ -35,37 +39,57 @@ def board_to_planes(board):
 class ChessEnv(gym.Env):
     """
     Chess environment where an agent learns by playing against itself.
+    action_scheme "codec" reads actions with movecodec (the same index is the
+    same move in every position, and action_masks() gives the legal ones for
+    masked PPO), "modulo" picks legal_moves[action % len(legal_moves)].
     """
-    def __init__(self):
+    def __init__(self, action_scheme="codec"):
         super(ChessEnv, self).__init__()
         self.board = chess.Board()
+        self.action_scheme = action_scheme
 
         self.observation_space = spaces.Box(low=0, high=1, shape=(8, 8, 12), dtype=np.float32)
-        self.action_space = spaces.Discrete(4672)  # All legal chess moves
+        self.action_space = spaces.Discrete(ACTION_SIZE)  # All legal chess moves
+
+        self.mask = np.zeros(ACTION_SIZE, dtype=bool)
+        self._update_state()
+
+    def _update_state(self):
+        # Once per position, the reward, done, mask and next step all read it
+        self.state = PlyState(self.board, with_actions=True)
+        action_mask(self.state.legal_actions, self.mask)
+
+    def action_masks(self):
+        """Legal actions of the current position, what MaskablePPO asks for."""
+        return self.mask
 
     def reset(self):
         self.board.reset()
+        self._update_state()
         return board_to_planes(self.board)
 
     def step(self, action):
-        legal_moves = list(self.board.legal_moves)
-        if len(legal_moves) == 0:
-            return board_to_planes(self.board), -1, True, {}  # Loss if no moves left
+        reward, done, info = self.play(action)
+        return board_to_planes(self.board), reward, done, info
+
+    def play(self, action):
+        """
+        Plays the action on the board and returns (reward, done, info)
+        without encoding the observation, ChessVecEnv encodes all boards at once.
+        """
+        if not self.state.legal_moves:
+            return -1, True, {}  # Loss if no moves left
         
-        move = legal_moves[action % len(legal_moves)]  # Ensure valid move
+        info = {}
+        move = self.state.legal_actions.get(int(action)) if self.action_scheme == "codec" else None
+        if move is None:
+            legal_moves = self.state.legal_moves
+            move = legal_moves[action % len(legal_moves)]  # Ensure valid move
+            if self.action_scheme == "codec":
+                info["illegal_action"] = True
         self.board.push(move)
-        
-        # Reward system: Win = +1, Loss = -1, Draw = 0, small -0.01 per move
-        reward = 0
-        if self.board.is_checkmate():
-            reward = 1 if self.board.turn == chess.BLACK else -1
-        elif self.board.is_stalemate() or self.board.is_insufficient_material():
-            reward = 0  # Draw
-        else:
-            reward = -0.01  # Small penalty to encourage faster wins
-        
-        done = self.board.is_game_over()
-        return board_to_planes(self.board), reward, done, {}
+        self._update_state()
+        return self.state.reward(), self.state.done, info
 
     def render(self, mode="human"):
         print(self.board)
@@ -76,31 +100,60 @@ class ChessEnv(gym.Env):
 ###############################################################################
 # 3) Train PPO on Self-Play Games
 ###############################################################################
-def train_ppo():
+def train_ppo(n_envs=8, n_workers=None, action_scheme="codec"):
     """
     Trains PPO on self-play games using the ChessEnv.
+    n_envs independent games are stepped by n_workers processes. With the
+    codec scheme illegal actions are masked out if sb3_contrib is installed.
     """
-    env = ChessEnv()
-    vec_env = make_vec_env(lambda: env, n_envs=4)  # Parallel training
+    vec_env = ChessVecEnv(partial(ChessEnv, action_scheme=action_scheme), n_envs=n_envs, n_workers=n_workers)  # Parallel training
 
-    model = PPO("CnnPolicy", vec_env, verbose=1)
+    if action_scheme == "codec" and MaskablePPO is not None:
+        model = MaskablePPO("CnnPolicy", vec_env, verbose=1)
+    else:
+        model = PPO("CnnPolicy", vec_env, verbose=1)
     model.learn(total_timesteps=500000)  # Train for 500,000 steps
 
     model.save("ppo_chess_strong")
+    vec_env.close()
     return model
 
 ###############################################################################
 # 4) Minimax Algorithm with PPO Integration
 ###############################################################################
-def alpha_beta_search(board, depth, alpha, beta, is_maximizing, model):
+TABLEBASE_WIN = 1000.0  # beyond anything the value head returns
+
+def alpha_beta_search(board, depth, alpha, beta, is_maximizing, model, batcher=None, tablebase=None, ply=0):
     """
     Minimax with Alpha-Beta pruning using PPO-based evaluation.
+    With a LeafBatcher the leaves are evaluated in batches instead of one by one.
+    With a Tablebase, endgames it covers are scored exactly instead of
+    searched, below the root so that there is always a move to return.
+    ply counts the plies from the root.
     """
+    if tablebase is not None and ply > 0:
+        # Mates and tablebase wins score TABLEBASE_WIN less the plies to
+        # mate, so the search takes the quickest win instead of any win
+        sign = 1 if board.turn == chess.WHITE else -1
+        if board.is_check() and board.is_checkmate():
+            return -sign * (TABLEBASE_WIN - ply), None
+        result = tablebase.probe_distance(board)
+        if result is not None:
+            wdl, plies = result
+            return sign * wdl * (TABLEBASE_WIN - ply - plies), None
+
+    if batcher is not None and depth == batcher.prefetch_depth:
+        batcher.prefetch(board, depth)
+
     if board.is_game_over() or depth == 0:
+        if batcher is not None:
+            return batcher.value(board), None
         return evaluate_position(board, model), None
 
     legal_moves = list(board.legal_moves)
     if not legal_moves:
+        if batcher is not None:
+            return batcher.value(board), None
         return evaluate_position(board, model), None
 
     best_move = None
@@ -109,7 +162,7 @@ def alpha_beta_search(board, depth, alpha, beta, is_maximizing, model):
         value = float('-inf')
         for move in legal_moves:
             board.push(move)
-            new_value, _ = alpha_beta_search(board, depth - 1, alpha, beta, False, model)
+            new_value, _ = alpha_beta_search(board, depth - 1, alpha, beta, False, model, batcher, tablebase, ply + 1)
             board.pop()
 
             if new_value > value:
@@ -123,7 +176,7 @@ def alpha_beta_search(board, depth, alpha, beta, is_maximizing, model):
         value = float('inf')
         for move in legal_moves:
             board.push(move)
-            new_value, _ = alpha_beta_search(board, depth - 1, alpha, beta, True, model)
+            new_value, _ = alpha_beta_search(board, depth - 1, alpha, beta, True, model, batcher, tablebase, ply + 1)
             board.pop()
 
             if new_value < value:
@@ -137,45 +190,149 @@ def alpha_beta_search(board, depth, alpha, beta, is_maximizing, model):
 ###############################################################################
 # 5) PPO-Based Evaluation Function
 ###############################################################################
+def evaluate_positions(boards, model):
+    """
+    Evaluates a list of boards with one forward pass through the PPO value head.
+    Returns a float array with one value per board.
+    """
+    obs = encode_boards(boards)
+    obs_tensor, _ = model.policy.obs_to_tensor(obs)
+    with torch.no_grad():
+        values = model.policy.predict_values(obs_tensor)
+
+    return values.cpu().numpy().reshape(-1)
+
 def evaluate_position(board, model):
     """
     Uses the trained PPO model to evaluate a board position.
     """
-    obs = board_to_planes(board)
-    obs = obs.reshape((1, 8, 8, 12))  # Add batch dimension
-    value = model.predict(obs)[0]  # PPO model evaluates board
+    return float(evaluate_positions([board], model)[0])
 
-    return value
+class LeafBatcher:
+    """
+    Deferred leaf evaluation for alpha_beta_search.
+    When the search reaches prefetch_depth plies above the leaves, every leaf
+    below that node is queued and evaluated in forward passes of up to
+    batch_size boards. The search then reads the values back by position hash.
+    Some queued leaves are never visited because of cutoffs, but evaluating
+    them in a batch costs far less than a separate forward pass per leaf.
+    """
+    def __init__(self, model, batch_size=256, prefetch_depth=1, tablebase=None):
+        self.model = model
+        self.tablebase = tablebase
+        self.batch_size = batch_size
+        self.prefetch_depth = prefetch_depth
+        self.values = {}
+        self.leaves = 0
+        self.batches = 0
+        self.misses = 0
+        self.seconds = 0.0
+
+    def clear(self):
+        """Drops the values of the previous search."""
+        self.values = {}
+
+    def prefetch(self, board, depth):
+        """Queues every leaf within depth plies of board and evaluates them."""
+        pending = {}
+        self._collect(board, depth, pending)
+
+        keys = list(pending)
+        boards = list(pending.values())
+        for start in range(0, len(boards), self.batch_size):
+            self._evaluate(keys[start:start + self.batch_size], boards[start:start + self.batch_size])
+
+    def _collect(self, board, depth, pending):
+        if self.tablebase is not None and self.tablebase.probe(board) is not None:
+            return  # the search scores it without the network
+        if depth == 0 or board.is_game_over():
+            key = chess.polyglot.zobrist_hash(board)
+            if key not in self.values and key not in pending:
+                pending[key] = board.copy(stack=False)
+            return
+
+        for move in board.legal_moves:
+            board.push(move)
+            self._collect(board, depth - 1, pending)
+            board.pop()
+
+    def _evaluate(self, keys, boards):
+        start = time.perf_counter()
+        values = evaluate_positions(boards, self.model)
+        self.seconds += time.perf_counter() - start
+        self.leaves += len(boards)
+        self.batches += 1
+        self.values.update(zip(keys, values.tolist()))
+
+    def value(self, board):
+        """Value of a leaf, evaluated on its own if it was not queued."""
+        key = chess.polyglot.zobrist_hash(board)
+        if key not in self.values:
+            self.misses += 1
+            self._evaluate([key], [board.copy(stack=False)])
+        return self.values[key]
+
+    def stats(self):
+        return {
+            "leaves": self.leaves,
+            "batches": self.batches,
+            "misses": self.misses,
+            "leaves_per_second": self.leaves / self.seconds if self.seconds else 0.0,
+        }
+
+def batched_alpha_beta_search(board, depth, is_maximizing, model, batch_size=256, prefetch_depth=1, tablebase=None):
+    """
+    alpha_beta_search with batched leaf evaluation, returns (value, move, batcher).
+    """
+    batcher = LeafBatcher(model, batch_size, min(prefetch_depth, depth), tablebase)
+    value, move = alpha_beta_search(board, depth, float('-inf'), float('inf'), is_maximizing, model, batcher, tablebase)
+    return value, move, batcher
 
 ###############################################################################
 # 6) PPO-Based Move Selection
 ###############################################################################
-def ppo_select_move(board, model):
+def ppo_select_move(board, model, action_scheme="codec"):
     """
     Uses the trained PPO model to select the best move.
+    action_scheme has to match the ChessEnv the model was trained on.
     """
     obs = board_to_planes(board)
-    action, _ = model.predict(obs)  # Use PPO to select move
-    legal_moves = list(board.legal_moves)
+    legal = legal_actions(board)
 
-    if action >= len(legal_moves):
-        action = 0  # Fallback to first move if invalid
+    if MaskablePPO is not None and isinstance(model, MaskablePPO):
+        action, _ = model.predict(obs, action_masks=action_mask(legal))
+    else:
+        action, _ = model.predict(obs)  # Use PPO to select move
+    action = int(action)
 
-    return legal_moves[action]  # Return the best move from PPO
+    legal_moves = list(legal.values())
+    if action_scheme == "modulo":
+        return legal_moves[action % len(legal_moves)]
+    return legal.get(action, legal_moves[0])  # Fallback to first move if invalid
 
 ###############################################################################
 # 7) Hybrid Chess Bot (PPO + Minimax)
 ###############################################################################
-def hybrid_chess_bot(board, minimax_depth=3, ppo_model=None):
+def hybrid_chess_bot(board, minimax_depth=3, ppo_model=None, batch_size=256, book=None, tablebase=None):
     """
     Hybrid bot using PPO for early-game and Minimax for deeper calculations.
+    batch_size=None evaluates the minimax leaves one at a time.
+    book (an openingbook.OpeningBook) is asked first, a book move needs
+    neither inference nor search. tablebase scores the endgames it covers.
     """
+    if book is not None:
+        move = book.pick(board)
+        if move is not None:
+            return move
+
     move = None
 
     if board.fullmove_number <= 10:  # Use PPO for early-game moves
         move = ppo_select_move(board, ppo_model)
+    elif batch_size is None:
+        _, move = alpha_beta_search(board, minimax_depth, float('-inf'), float('inf'), board.turn == chess.WHITE, ppo_model, tablebase=tablebase)
     else:  # Use Minimax for deep calculations
-        _, move = alpha_beta_search(board, minimax_depth, float('-inf'), float('inf'), board.turn == chess.WHITE, ppo_model)
+        _, move, _ = batched_alpha_beta_search(board, minimax_depth, board.turn == chess.WHITE, ppo_model, batch_size, tablebase=tablebase)
 
     return move
 
@@ -185,16 +342,21 @@ def hybrid_chess_bot(board, minimax_depth=3, ppo_model=None):
 def main():
     # Train PPO if not already trained
     try:
-        ppo_model = PPO.load("ppo_chess_strong")
+        ppo_model = (MaskablePPO or PPO).load("ppo_chess_strong")
     except:
         print("No trained model found. Training PPO now...")
         ppo_model = train_ppo()
 
+    # Mapped once, the bot plays from it until the game leaves the book
+    book = open_book("opening_book.bin")
+    # Syzygy files in ./syzygy if there are any, the built-in bitbases otherwise
+    tablebase = Tablebase("syzygy")
+
     # Start a game
     board = chess.Board()
 
     while not board.is_game_over():
-        move = hybrid_chess_bot(board, minimax_depth=3, ppo_model=ppo_model)
+        move = hybrid_chess_bot(board, minimax_depth=3, ppo_model=ppo_model, book=book, tablebase=tablebase)
         board.push(move)
 
     # Print final game result
@@ -6,7 +6,10 @@ import torch.nn as nn
 import torch.optim as optim
 import torch.nn.functional as F
 import numpy as np
-from collections import deque
+from encoder import PLANE_SIZE, board_bitboards, encode_boards, planes_from_bitboards
+from selfplay import SelfPlayStats, generate_games, play_one_game_random
+from positiondataset import PositionDatasetWriter
+from positionstream import ShardedPositionStream
 
 ############################################
 # 1) Neural Network for Board Evaluation
@@ -38,45 +41,20 @@ class ChessValueNetwork(nn.Module):
 ############################################
 # 2) Board Encoding
 ############################################
-# We'll define a function that encodes a python-chess board
-# into a fixed-size (768,) vector for the network.
-#
-# We will do a naive "one-hot" approach:
-#   For each square (0..63), check if it has a piece.
-#   If it does, find which one of the 12 piece slots it belongs to.
-#   Then that index in our vector = 1, rest = 0.
+# We encode a python-chess board into a fixed-size (768,) vector for the
+# network, a one-hot of which of the 12 piece slots stands on each square
+# (index 12 * square + slot).
 #
 # The 12 piece slots are: 
 #   [White Pawn, White Knight, White Bishop, White Rook, White Queen, White King,
 #    Black Pawn, Black Knight, Black Bishop, Black Rook, Black Queen, Black King]
+#
+# The encoding itself lives in encoder.py and is shared with rlbuilder.
 ############################################
 
 def encode_board(board: chess.Board) -> np.ndarray:
     # 64 squares * 12 piece types = 768
-    encoded = np.zeros(768, dtype=np.float32)
-    
-    # List out piece types in a consistent order
-    piece_map = {
-        chess.PAWN:   0,
-        chess.KNIGHT: 1,
-        chess.BISHOP: 2,
-        chess.ROOK:   3,
-        chess.QUEEN:  4,
-        chess.KING:   5
-    }
-
-    for square in chess.SQUARES:  # 0..63
-        piece = board.piece_at(square)
-        if piece is not None:
-            # piece_map index
-            offset = piece_map[piece.piece_type]
-            if piece.color == chess.BLACK:
-                offset += 6  # black pieces in second half
-            # set the one-hot
-            index = 12 * square + offset
-            encoded[index] = 1.0
-
-    return encoded
+    return encode_boards([board]).reshape(PLANE_SIZE)
 
 ############################################
 # 3) Simple Self-Play Environment
@@ -89,61 +67,80 @@ def encode_board(board: chess.Board) -> np.ndarray:
 #
 # We'll store states in a buffer, then at the end of the game
 # we assign the outcome from White's perspective.
+#
+# The games are played by worker processes (see selfplay.py) and
+# streamed to the trainer as they finish.
 ############################################
 
-def play_one_game_random():
-    """Play one game using random moves for both sides.
-       Returns: (state_history, outcome)
-        - state_history: list of (board_fen, is_white_turn)
-        - outcome in [-1, 0, +1] from White's perspective
-    """
-    board = chess.Board()
-    state_history = []
-    
-    while not board.is_game_over():
-        # record the state
-        state_history.append((board.fen(), board.turn))
-        
-        # choose a random legal move
-        moves = list(board.legal_moves)
-        move = random.choice(moves)
-        board.push(move)
-    
-    result = board.result()  # e.g. "1-0", "0-1", "1/2-1/2"
-    if result == "1-0":
-        outcome = 1.0
-    elif result == "0-1":
-        outcome = -1.0
-    else:
-        outcome = 0.0
-    
-    return state_history, outcome
-
 ############################################
 # 4) Replay Buffer
 ############################################
+# Positions are stored already encoded, as their 12 piece bitboards
+# (768 bits = 96 bytes each), in preallocated NumPy arrays used as a ring
+# buffer. Sampling draws all indices at once and unpacks only the sampled
+# positions into a reused batch array.
+############################################
 class ReplayBuffer:
-    def __init__(self, max_size=10000):
-        self.buffer = deque(maxlen=max_size)
+    def __init__(self, max_size=10000, seed=None):
+        self.max_size = max_size
+        self.bitboards = np.zeros((max_size, 12), dtype=np.uint64)
+        self.targets = np.zeros(max_size, dtype=np.float32)
+        self.size = 0
+        self.next = 0  # slot the next position goes into
+        self.rng = np.random.default_rng(seed)
+        self.batch = np.zeros((0, PLANE_SIZE), dtype=np.float32)
 
-    def push(self, state, value):
+    def push(self, board, value):
         """
-        state: a fen string
+        board: a chess.Board
         value: float in [-1,1], the outcome from White's perspective
         """
-        self.buffer.append((state, value))
-    
-    def sample(self, batch_size=32):
-        mini_batch = random.sample(self.buffer, min(batch_size, len(self.buffer)))
-        states = []
-        targets = []
-        for s, v in mini_batch:
-            states.append(s)
-            targets.append(v)
+        self.extend([board], value)
+
+    def extend(self, boards, values):
+        """
+        Adds several boards at once, values is one float or one per board.
+        The oldest positions are overwritten once the buffer is full.
+        """
+        bitboards = board_bitboards(boards)[-self.max_size:]
+        values = np.broadcast_to(np.asarray(values, dtype=np.float32), (len(boards),))[-self.max_size:]
+
+        slots = (self.next + np.arange(len(bitboards))) % self.max_size
+        self.bitboards[slots] = bitboards
+        self.targets[slots] = values
+        self.next = (self.next + len(bitboards)) % self.max_size
+        self.size = min(self.size + len(bitboards), self.max_size)
+
+    def sample_arrays(self, batch_size=32):
+        """
+        Returns ([B, 768] planes, [B] targets) as NumPy arrays, drawn with
+        replacement. The planes array is reused by the next call.
+        """
+        n = min(batch_size, self.size)
+        if len(self.batch) < n:
+            self.batch = np.zeros((n, PLANE_SIZE), dtype=np.float32)
+
+        indices = self.rng.integers(0, self.size, n)
+        planes = planes_from_bitboards(self.bitboards[indices], self.batch[:n])
+        return planes, self.targets[indices]
+
+    def sample(self, batch_size=32, device=None):
+        """
+        Returns ([B, 768], [B, 1]) float tensors ready for the network.
+        Unlike sample_arrays() the tensors are not overwritten by the next call.
+        """
+        planes, targets = self.sample_arrays(batch_size)
+        states = torch.from_numpy(planes)
+        # .to() a CPU device returns the same tensor, still a view of self.batch
+        states = states.clone() if device is None or torch.device(device).type == "cpu" else states.to(device)
+        targets = torch.from_numpy(targets).to(device).unsqueeze(-1)
         return states, targets
-    
+
+    def memory_bytes(self):
+        return self.bitboards.nbytes + self.targets.nbytes + self.batch.nbytes
+
     def __len__(self):
-        return len(self.buffer)
+        return self.size
 
 ############################################
 # 5) Training Loop
@@ -155,7 +152,14 @@ class ReplayBuffer:
 #  - Over time, it should learn some notion of better/worse positions
 ############################################
 
-def train_value_network():
+def train_value_network(n_games=1000, workers=None, dataset_path=None, seed=None):
+    """
+    n_games self-play games are generated by `workers` processes (one per
+    CPU by default, 0 plays them in this process) while this process trains.
+    seed makes the games reproducible, by default every run plays new ones.
+    With dataset_path the games are also appended to that on-disk dataset
+    (see positiondataset.py) so later runs can train on them again.
+    """
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     net = ChessValueNetwork().to(device)
     optimizer = optim.Adam(net.parameters(), lr=1e-4)
@@ -163,59 +167,88 @@ def train_value_network():
 
     buffer = ReplayBuffer(max_size=20000)
     
-    n_games = 1000       # Number of self-play games
     train_every = 1      # Train after every game, for example
     batch_size = 64
     print_interval = 50
 
-    for game_idx in range(1, n_games+1):
-        # 1) Play one self-play game
-        states, outcome = play_one_game_random()
+    stats = SelfPlayStats()
+    writer = PositionDatasetWriter(dataset_path) if dataset_path else None
+
+    # The writer is closed even if training fails, otherwise the up to
+    # flush_size buffered positions it has not written yet would be lost
+    try:
+        # 1) Self-play games arrive from the workers as they finish
+        for game_idx, (states, outcome) in enumerate(generate_games(n_games, workers, seed), start=1):
+            stats.add(states)
         
-        # 2) Add all positions from that game to the buffer
-        for fen, is_white_turn in states:
+            # 2) Add all positions from that game to the buffer
             # The outcome is always from White's perspective. 
             # If the position is from black's perspective, we might need to invert sign 
             # if we want "Value(s) from current side's perspective". 
             # But let's keep it from White's perspective for simplicity.
             #   => If black is to move, the outcome from White's perspective is still 'outcome'
             # This is typical in "White-centric" approaches.
-            buffer.push(fen, outcome)
+            boards = [chess.Board(fen=fen) for fen, is_white_turn in states]
+            buffer.extend(boards, outcome)
+            if writer is not None:
+                writer.add_game(boards, outcome)
         
-        # 3) Train
-        if game_idx % train_every == 0:
-            # We'll run a small number of training steps
-            for _ in range(5):  # do e.g. 5 mini-batches
-                states_sample, targets_sample = buffer.sample(batch_size)
-                if not states_sample:
-                    break
-
-                # encode states
-                encoded_states = []
-                for fen in states_sample:
-                    b = chess.Board(fen=fen)
-                    encoded = encode_board(b)
-                    encoded_states.append(encoded)
-                encoded_states = np.stack(encoded_states, axis=0)  # shape [B, 768]
-                encoded_states = torch.tensor(encoded_states, device=device, dtype=torch.float)
-
-                targets = torch.tensor(targets_sample, device=device, dtype=torch.float).unsqueeze(-1)  # [B,1]
+            # 3) Train
+            if game_idx % train_every == 0:
+                # We'll run a small number of training steps
+                for _ in range(5):  # do e.g. 5 mini-batches
+                    if len(buffer) == 0:
+                        break
+
+                    # already encoded, shape [B, 768] and [B, 1]
+                    encoded_states, targets = buffer.sample(batch_size, device)
                 
-                # forward
-                pred = net(encoded_states)
-                loss = loss_fn(pred, targets)
+                    # forward
+                    pred = net(encoded_states)
+                    loss = loss_fn(pred, targets)
                 
-                # backward
-                optimizer.zero_grad()
-                loss.backward()
-                optimizer.step()
-
-        # 4) Print progress
-        if game_idx % print_interval == 0:
-            print(f"Game {game_idx}/{n_games} completed. Buffer size={len(buffer)}")
+                    # backward
+                    optimizer.zero_grad()
+                    loss.backward()
+                    optimizer.step()
+
+            # 4) Print progress
+            if game_idx % print_interval == 0:
+                rates = stats.rates()
+                print(f"Game {game_idx}/{n_games} completed. Buffer size={len(buffer)} ({buffer.memory_bytes() / 2**20:.1f} MB) "
+                      f"({rates['games_per_second']:.1f} games/s, {rates['positions_per_second']:.0f} positions/s)")
+    finally:
+        if writer is not None:
+            writer.close()
     
     return net
 
+def train_from_dataset(dataset_path, epochs=1, batch_size=256, num_workers=0, net=None):
+    """
+    Trains on every position of an on-disk dataset, streamed in shuffled
+    batches without loading the dataset into memory.
+    """
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    net = (net or ChessValueNetwork()).to(device)
+    optimizer = optim.Adam(net.parameters(), lr=1e-4)
+    loss_fn = nn.MSELoss()
+
+    stream = ShardedPositionStream(dataset_path, batch_size=batch_size, epochs=epochs)
+    loader = torch.utils.data.DataLoader(stream, batch_size=None, num_workers=num_workers)
+
+    for step, (encoded_states, targets) in enumerate(loader, start=1):
+        pred = net(encoded_states.to(device))
+        loss = loss_fn(pred, targets.to(device))
+
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+
+        if step % 1000 == 0:
+            print(f"Step {step}: loss={loss.item():.4f}")
+
+    return net
+
 ############################################
 # 6) Putting it all together
 ############################################
@@ -0,0 +1,130 @@
+import os
+import time
+import queue
+import random
+import chess
+import multiprocessing as mp
+
+############################################
+# 1) Random Self-Play Games
+############################################
+# Both sides play random legal moves until the game ends in checkmate or
+# a draw. The outcome is +1 for White if White won, -1 if Black won,
+# and 0 for a draw.
+############################################
+
+def play_one_game_random(rng=random):
+    """Play one game using random moves for both sides.
+       Returns: (state_history, outcome)
+        - state_history: list of (board_fen, is_white_turn)
+        - outcome in [-1, 0, +1] from White's perspective
+    """
+    board = chess.Board()
+    state_history = []
+
+    while not board.is_game_over():
+        # record the state
+        state_history.append((board.fen(), board.turn))
+
+        # choose a random legal move
+        moves = list(board.legal_moves)
+        move = rng.choice(moves)
+        board.push(move)
+
+    result = board.result()  # e.g. "1-0", "0-1", "1/2-1/2"
+    if result == "1-0":
+        outcome = 1.0
+    elif result == "0-1":
+        outcome = -1.0
+    else:
+        outcome = 0.0
+
+    return state_history, outcome
+
+############################################
+# 2) Parallel Game Generation
+############################################
+# Producer/consumer: worker processes play games and put every finished
+# game on a queue, the trainer takes them off as they arrive. The queue
+# is bounded so fast workers cannot pile up games faster than the trainer
+# uses them. Each worker puts None on the queue when it is done.
+############################################
+
+def self_play_worker(game_queue, n_games, seed):
+    rng = random.Random(seed)
+    for _ in range(n_games):
+        game_queue.put(play_one_game_random(rng))
+    game_queue.put(None)
+
+def generate_games(n_games, workers=None, seed=None, queue_size=None, poll_interval=1.0):
+    """Yields (state_history, outcome) for n_games games, in the order they finish.
+       workers=0 plays them in this process, None uses one worker per CPU.
+       Worker i plays with seed + i, seed=None draws a fresh base seed so
+       every run plays different games.
+       Raises RuntimeError if a worker dies before finishing its games.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if seed is None:
+        seed = random.SystemRandom().randrange(2**32)
+
+    if workers == 0:
+        rng = random.Random(seed)
+        for _ in range(n_games):
+            yield play_one_game_random(rng)
+        return
+
+    ctx = mp.get_context("spawn")
+    game_queue = ctx.Queue(maxsize=queue_size or 4 * workers)
+
+    # Spread the games as evenly as possible
+    shares = [n_games // workers + (1 if i < n_games % workers else 0) for i in range(workers)]
+    processes = [ctx.Process(target=self_play_worker, args=(game_queue, share, seed + i), daemon=True)
+                 for i, share in enumerate(shares) if share > 0]
+    for process in processes:
+        process.start()
+
+    try:
+        running = len(processes)
+        while running:
+            try:
+                game = game_queue.get(timeout=poll_interval)
+            except queue.Empty:
+                # A worker that died never puts its None on the queue
+                for process in processes:
+                    if process.exitcode not in (None, 0):
+                        raise RuntimeError(f"self-play worker {process.pid} exited with code {process.exitcode}")
+                if not any(process.is_alive() for process in processes):
+                    raise RuntimeError("self-play workers exited without finishing their games")
+                continue
+
+            if game is None:
+                running -= 1
+            else:
+                yield game
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+class SelfPlayStats:
+    """Games and positions per second of a generate_games run."""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.games = 0
+        self.positions = 0
+
+    def add(self, states):
+        self.games += 1
+        self.positions += len(states)
+
+    def rates(self):
+        elapsed = time.perf_counter() - self.start
+        return {
+            "games": self.games,
+            "positions": self.positions,
+            "seconds": elapsed,
+            "games_per_second": self.games / elapsed if elapsed else 0.0,
+            "positions_per_second": self.positions / elapsed if elapsed else 0.0,
+        }
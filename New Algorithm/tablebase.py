@@ -0,0 +1,264 @@
+import os
+import glob
+import chess
+import chess.syzygy
+import numpy as np
+
+###############################################################################
+# Endgame Tablebase Probing
+###############################################################################
+# Tablebase.probe(board) gives the exact result of a covered endgame as a
+# win / draw / loss for the side to move, or None. probe_distance() adds
+# how many plies the win takes, which a search needs to make progress
+# instead of shuffling between positions that are all "won".
+#
+#   1) Syzygy files (*.rtbw, *.rtbz for distances), when a directory of
+#      them is given. Their distance is DTZ, plies to the next capture or
+#      pawn move.
+#   2) Tables for KQK, KRK and KPK, either color as the strong side, built
+#      here by retrograde analysis the first time they are needed and
+#      memory-mapped from then on.
+#
+# A table holds one byte per position: 0 for a draw, otherwise 1 + the
+# plies the side with the piece needs to mate.
+# Positions are indexed from the strong side's point of view, the strong
+# side moved to White by flipping the board when it is Black:
+#
+#   index = 4096 * white_king + 64 * black_king + piece_square
+#
+# and the file is White to move followed by Black to move, 512 KB per
+# endgame. Illegal positions read as draws. The fifty-move rule is ignored.
+###############################################################################
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "endgame_tables")
+TABLE_PIECES = {chess.QUEEN: "kqk", chess.ROOK: "krk", chess.PAWN: "kpk"}
+POSITIONS = 64 * 64 * 64
+DRAW = 255  # plies of a position that is not won while solving
+
+###############################################################################
+# 1) Retrograde Analysis
+###############################################################################
+# All 2 * 64^3 index combinations at once as NumPy arrays. The moves of
+# every position are listed once as (legal, successor index) arrays, then
+#
+#   White to move: 1 + the fewest plies to mate over its moves
+#   Black to move:  1 + the most plies to mate over its moves, or 0 when
+#                   mated (taking the piece or stalemate draws)
+#
+# is iterated from the mates until nothing changes, iteration t finding
+# every mate within t plies. KPK promotions lead into the solved KQK and
+# KRK. Sliders are only ever blocked by the white king, the black king is
+# the one they attack.
+###############################################################################
+SQUARES = np.arange(64)
+RANKS, FILES = SQUARES >> 3, SQUARES & 7
+KING_STEPS = [(dr, df) for dr in (-1, 0, 1) for df in (-1, 0, 1) if dr or df]
+SLIDES = {
+    chess.ROOK: [(1, 0), (-1, 0), (0, 1), (0, -1)],
+    chess.QUEEN: [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)],
+}
+
+def _tables():
+    distance = np.maximum(abs(RANKS[:, None] - RANKS[None, :]), abs(FILES[:, None] - FILES[None, :]))
+
+    # between[a, b, c]: c lies strictly between a and b on a line
+    between = np.zeros((64, 64, 64), dtype=bool)
+    for a in range(64):
+        for b in range(64):
+            for c in chess.scan_forward(chess.between(a, b)):
+                between[a, b, c] = True
+
+    same_line = RANKS[:, None] == RANKS[None, :]
+    same_line |= FILES[:, None] == FILES[None, :]
+    diagonal = abs(RANKS[:, None] - RANKS[None, :]) == abs(FILES[:, None] - FILES[None, :])
+    lines = {chess.ROOK: same_line, chess.QUEEN: same_line | diagonal}
+    np.fill_diagonal(lines[chess.ROOK], False)
+    np.fill_diagonal(lines[chess.QUEEN], False)
+
+    pawn_attacks = np.zeros((64, 64), dtype=bool)
+    for square in range(56):
+        for target in chess.scan_forward(chess.BB_PAWN_ATTACKS[chess.WHITE][square]):
+            pawn_attacks[square, target] = True
+
+    return distance, between, lines, pawn_attacks
+
+def _step(squares, dr, df):
+    """(on board, target square) of squares moved by (dr, df)."""
+    on_board = (RANKS[squares] + dr >= 0) & (RANKS[squares] + dr < 8) & (FILES[squares] + df >= 0) & (FILES[squares] + df < 8)
+    return on_board, np.where(on_board, squares + 8 * dr + df, 0)
+
+def generate_table(piece_type, promotions=None):
+    """
+    Solves K + piece vs K. Returns (white_to_move, black_to_move) uint8
+    arrays over the index in the file encoding, 0 or 1 + plies. KPK needs
+    the solved KQK and KRK as promotions, {piece_type: black_to_move}.
+    """
+    distance, between, lines, pawn_attacks = _tables()
+    wk, bk, piece = (a.ravel() for a in np.indices((64, 64, 64), dtype=np.int32))
+
+    def attacked(square):
+        """The piece attacks square, the white king blocking, the black king not."""
+        if piece_type == chess.PAWN:
+            return pawn_attacks[piece, square]
+        return lines[piece_type][piece, square] & ~between[piece, square, wk]
+
+    valid = (wk != bk) & (wk != piece) & (bk != piece) & (distance[wk, bk] > 1)
+    if piece_type == chess.PAWN:
+        valid &= (RANKS[piece] > 0) & (RANKS[piece] < 7)
+    valid_w = valid & ~attacked(bk)
+    valid_b = valid
+
+    # White's moves, successor indices into the Black-to-move table
+    white_moves = []
+    promotion_plies = np.full(POSITIONS, DRAW, dtype=np.int32)
+    for dr, df in KING_STEPS:
+        on_board, target = _step(wk, dr, df)
+        legal = on_board & (target != piece) & (distance[target, bk] > 1)
+        white_moves.append((legal, 4096 * target + 64 * bk + piece))
+
+    if piece_type == chess.PAWN:
+        on_board, target = _step(piece, 1, 0)
+        free = on_board & (target != wk) & (target != bk)
+        promoting = free & (RANKS[target] == 7)
+        for table in promotions.values():
+            plies = table[4096 * wk + 64 * bk + target].astype(np.int32)
+            promotion_plies = np.where(promoting & (plies > 0), np.minimum(promotion_plies, plies), promotion_plies)
+        white_moves.append((free & ~promoting, 4096 * wk + 64 * bk + target))
+
+        double, target2 = _step(piece, 2, 0)
+        double &= free & (RANKS[piece] == 1) & (target2 != wk) & (target2 != bk)
+        white_moves.append((double, 4096 * wk + 64 * bk + target2))
+    else:
+        for dr, df in SLIDES[piece_type]:
+            open_ray = np.ones(POSITIONS, dtype=bool)
+            for distance_steps in range(1, 8):
+                on_board, target = _step(piece, dr * distance_steps, df * distance_steps)
+                open_ray &= on_board & (target != wk) & (target != bk)
+                white_moves.append((open_ray.copy(), 4096 * wk + 64 * bk + target))
+
+    # Black's king moves, successor indices into the White-to-move table
+    black_moves = []
+    has_move = np.zeros(POSITIONS, dtype=bool)
+    for dr, df in KING_STEPS:
+        on_board, target = _step(bk, dr, df)
+        legal = on_board & (distance[target, wk] > 1) & ~attacked(target)
+        capture = legal & (target == piece)
+        has_move |= legal
+        black_moves.append((legal & ~capture, capture, 4096 * wk + 64 * target + piece))
+
+    mate = valid_b & attacked(bk) & ~has_move
+    plies_w = np.full(POSITIONS, DRAW, dtype=np.int32)
+    plies_b = np.where(mate, 0, DRAW)
+    while True:
+        # promotion_plies is stored + 1, which is the ply of the promotion
+        new_w = promotion_plies.copy()
+        for legal, successor in white_moves:
+            new_w = np.where(legal, np.minimum(new_w, plies_b[successor] + 1), new_w)
+        new_w = np.where(valid_w, np.minimum(new_w, DRAW), DRAW)
+
+        new_b = np.zeros(POSITIONS, dtype=np.int32)
+        for legal, capture, successor in black_moves:
+            new_b = np.where(legal, np.maximum(new_b, new_w[successor] + 1), new_b)
+            new_b = np.where(capture, DRAW, new_b)
+        new_b = np.where(valid_b & has_move, np.minimum(new_b, DRAW), DRAW)
+        new_b[mate] = 0
+
+        if np.array_equal(new_w, plies_w) and np.array_equal(new_b, plies_b):
+            # File encoding, 0 for a draw and 1 + plies for a win
+            return (np.where(plies_w < DRAW, plies_w + 1, 0).astype(np.uint8),
+                    np.where(plies_b < DRAW, plies_b + 1, 0).astype(np.uint8))
+        plies_w, plies_b = new_w, new_b
+
+def build_tables(directory=TABLE_DIR):
+    """Solves KQK, KRK and KPK and writes them to directory."""
+    os.makedirs(directory, exist_ok=True)
+    solved = {}
+    for piece_type in (chess.QUEEN, chess.ROOK, chess.PAWN):
+        promotions = {p: solved[p][1] for p in (chess.QUEEN, chess.ROOK)} if piece_type == chess.PAWN else None
+        solved[piece_type] = generate_table(piece_type, promotions)
+
+        path = os.path.join(directory, TABLE_PIECES[piece_type] + ".bin")
+        with open(path + ".tmp", "wb") as handle:
+            for plies in solved[piece_type]:
+                handle.write(plies.tobytes())
+        os.replace(path + ".tmp", path)
+
+###############################################################################
+# 2) Probing
+###############################################################################
+class Tablebase:
+    """
+    Exact endgame results for the search. syzygy_path is a directory of
+    Syzygy files, used when it holds any. The KQK, KRK and KPK tables are
+    built into table_dir on first use (a few seconds) unless tables=False.
+    """
+    def __init__(self, syzygy_path=None, table_dir=TABLE_DIR, tables=True):
+        self.syzygy = None
+        if syzygy_path and glob.glob(os.path.join(syzygy_path, "*.rtbw")):
+            self.syzygy = chess.syzygy.open_tablebase(syzygy_path)
+
+        self.tables = {}
+        if tables:
+            paths = {p: os.path.join(table_dir, name + ".bin") for p, name in TABLE_PIECES.items()}
+            if not all(os.path.exists(path) and os.path.getsize(path) == 2 * POSITIONS for path in paths.values()):
+                build_tables(table_dir)
+            self.tables = {p: np.memmap(path, dtype=np.uint8, mode="r") for p, path in paths.items()}
+
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, board):
+        """1 (side to move wins), 0 (draw), -1 (loses), None if not covered."""
+        result = self.probe_distance(board)
+        return result[0] if result is not None else None
+
+    def probe_distance(self, board):
+        """
+        (wdl, plies) as for probe() plus the plies the win takes, 0 for draws
+        and for Syzygy positions without DTZ files. None if not covered.
+        """
+        pieces = chess.popcount(board.occupied)
+        if pieces > 3 and self.syzygy is None:
+            return None
+        self.probes += 1
+
+        result = None
+        if self.syzygy is not None and not board.castling_rights:
+            wdl = self.syzygy.get_wdl(board)
+            if wdl is not None:
+                wdl = 1 if wdl > 1 else -1 if wdl < -1 else 0  # cursed wins are fifty-move draws
+                dtz = self.syzygy.get_dtz(board) if wdl else 0
+                result = (wdl, abs(dtz) if dtz is not None else 0)
+        if result is None and pieces == 3:
+            result = self._probe_table(board)
+
+        if result is not None:
+            self.hits += 1
+        return result
+
+    def _probe_table(self, board):
+        piece_square = chess.lsb(board.occupied & ~board.kings)
+        piece_type = board.piece_type_at(piece_square)
+        if piece_type in (chess.KNIGHT, chess.BISHOP):
+            return (0, 0)  # a lone minor piece cannot mate
+        if piece_type not in self.tables:
+            return None
+
+        strong = board.color_at(piece_square)
+        wk, bk = board.king(strong), board.king(not strong)
+        if strong == chess.BLACK:
+            wk, bk, piece_square = chess.square_mirror(wk), chess.square_mirror(bk), chess.square_mirror(piece_square)
+
+        index = 4096 * wk + 64 * bk + piece_square
+        if board.turn != strong:
+            index += POSITIONS
+        plies = int(self.tables[piece_type][index])
+        if not plies:
+            return (0, 0)
+        return (1 if board.turn == strong else -1, plies - 1)
+
+    def stats(self):
+        return {"probes": self.probes, "hits": self.hits}
+
+    def close(self):
+        if self.syzygy is not None:
+            self.syzygy.close()
@@ -0,0 +1,193 @@
+import os
+import numpy as np
+import multiprocessing as mp
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+from encoder import PLANE_SHAPE, encode_board, encode_boards
+
+###############################################################################
+# Subprocess Vectorized Chess Environment
+###############################################################################
+# n_envs independent games spread over n_workers processes. Each worker owns
+# a contiguous slice of the environments, plays the actions for its slice
+# and encodes all its boards with one encode_boards call straight into an
+# observation buffer in shared memory. Only actions, rewards, dones and
+# infos go through the pipes.
+#
+# The environments are built in the workers by env_fn (a class works) and
+# need a board attribute plus play(action) -> (reward, done, info), the
+# step() of ChessEnv / ChessEvaluationEnv without the observation.
+#
+# Environments with action_masks() (ChessEnv) also get their legal-action
+# masks copied into a shared buffer after every step, so masked PPO reads
+# all of them at once instead of asking every environment through a pipe.
+###############################################################################
+
+def _worker(remote, parent_remote, env_fn, start, stop, n_envs, obs_buffer, mask_buffer):
+    parent_remote.close()
+    envs = [env_fn() for _ in range(start, stop)]
+    obs = np.frombuffer(obs_buffer, dtype=np.float32).reshape((n_envs,) + PLANE_SHAPE)[start:stop]
+    masks = np.frombuffer(mask_buffer, dtype=bool).reshape(n_envs, -1)[start:stop] if mask_buffer is not None else None
+
+    def encode_all():
+        encode_boards([env.board for env in envs], out=obs)
+        if masks is not None:
+            for i, env in enumerate(envs):
+                masks[i] = env.action_masks()
+
+    try:
+        while True:
+            command, data = remote.recv()
+
+            if command == "step":
+                rewards = np.zeros(len(envs), dtype=np.float32)
+                dones = np.zeros(len(envs), dtype=bool)
+                infos = []
+                for i, (env, action) in enumerate(zip(envs, data)):
+                    rewards[i], dones[i], info = env.play(action)
+                    if dones[i]:
+                        # What SB3 expects of an env that resets itself
+                        info = dict(info, terminal_observation=encode_board(env.board))
+                        env.reset()
+                    infos.append(info)
+                encode_all()
+                remote.send((rewards, dones, infos))
+            elif command == "reset":
+                for env in envs:
+                    env.reset()
+                encode_all()
+                remote.send(None)
+            elif command == "seed":
+                remote.send([env.seed(data + i) if hasattr(env, "seed") else None for i, env in enumerate(envs)])
+            elif command == "get_attr":
+                remote.send([getattr(envs[i], data[0]) for i in data[1]])
+            elif command == "set_attr":
+                name, value, indices = data
+                for i in indices:
+                    setattr(envs[i], name, value)
+                remote.send(None)
+            elif command == "env_method":
+                name, args, kwargs, indices = data
+                remote.send([getattr(envs[i], name)(*args, **kwargs) for i in indices])
+            elif command == "close":
+                for env in envs:
+                    env.close()
+                remote.close()
+                break
+    except KeyboardInterrupt:
+        pass
+
+class ChessVecEnv(VecEnv):
+    """
+    SB3 VecEnv over n_envs independent chess games in n_workers processes
+    (one per CPU by default, never more than n_envs).
+    """
+    def __init__(self, env_fn, n_envs=8, n_workers=None):
+        n_workers = min(n_workers or os.cpu_count() or 1, n_envs)
+        ctx = mp.get_context("spawn")
+
+        # Spaces come from a local instance, it is never stepped
+        env = env_fn()
+        observation_space, action_space = env.observation_space, env.action_space
+        has_masks = hasattr(env, "action_masks")
+        env.close()
+
+        self.obs_buffer = ctx.RawArray("f", n_envs * int(np.prod(PLANE_SHAPE)))
+        self.obs = np.frombuffer(self.obs_buffer, dtype=np.float32).reshape((n_envs,) + PLANE_SHAPE)
+        self.mask_buffer = ctx.RawArray("b", n_envs * action_space.n) if has_masks else None
+        self.masks = np.frombuffer(self.mask_buffer, dtype=bool).reshape(n_envs, -1) if has_masks else None
+
+        # Contiguous slices of environments per worker
+        bounds = np.linspace(0, n_envs, n_workers + 1).astype(int)
+        self.slices = list(zip(bounds[:-1], bounds[1:]))
+        self.remotes, self.processes = [], []
+        for start, stop in self.slices:
+            remote, work_remote = ctx.Pipe()
+            process = ctx.Process(target=_worker, args=(work_remote, remote, env_fn, start, stop, n_envs, self.obs_buffer, self.mask_buffer), daemon=True)
+            process.start()
+            work_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+
+        super().__init__(n_envs, observation_space, action_space)
+
+        self.actions = None
+        self.waiting = False
+        self.closed = False
+
+    def reset(self):
+        for remote in self.remotes:
+            remote.send(("reset", None))
+        for remote in self.remotes:
+            remote.recv()
+        return self.obs.copy()
+
+    def step_async(self, actions):
+        for remote, (start, stop) in zip(self.remotes, self.slices):
+            remote.send(("step", actions[start:stop]))
+        self.waiting = True
+
+    def step_wait(self):
+        results = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+
+        rewards = np.concatenate([r for r, d, i in results])
+        dones = np.concatenate([d for r, d, i in results])
+        infos = [info for r, d, i in results for info in i]
+        return self.obs.copy(), rewards, dones, infos
+
+    def close(self):
+        if self.closed:
+            return
+        if self.waiting:
+            for remote in self.remotes:
+                remote.recv()
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+    def seed(self, seed=None):
+        if seed is None:
+            seed = np.random.randint(0, 2**31 - 1)
+        for remote, (start, stop) in zip(self.remotes, self.slices):
+            remote.send(("seed", seed + start))
+        return [s for remote in self.remotes for s in remote.recv()]
+
+    def _per_worker(self, indices):
+        """(remote, local indices) of each worker holding some of indices."""
+        indices = self._get_indices(indices)
+        for remote, (start, stop) in zip(self.remotes, self.slices):
+            local = [i - start for i in indices if start <= i < stop]
+            if local:
+                yield remote, local
+
+    def get_attr(self, attr_name, indices=None):
+        targets = list(self._per_worker(indices))
+        for remote, local in targets:
+            remote.send(("get_attr", (attr_name, local)))
+        return [value for remote, local in targets for value in remote.recv()]
+
+    def set_attr(self, attr_name, value, indices=None):
+        targets = list(self._per_worker(indices))
+        for remote, local in targets:
+            remote.send(("set_attr", (attr_name, value, local)))
+        for remote, local in targets:
+            remote.recv()
+
+    def action_masks(self):
+        """(n_envs, n_actions) legal-action masks of the current positions."""
+        return self.masks.copy()
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        # sb3_contrib's get_action_masks() comes through here, answer it from the shared buffer
+        if method_name == "action_masks" and self.masks is not None and not method_args and not method_kwargs:
+            return list(self.masks[list(self._get_indices(indices))].copy())
+
+        targets = list(self._per_worker(indices))
+        for remote, local in targets:
+            remote.send(("env_method", (method_name, method_args, method_kwargs, local)))
+        return [value for remote, local in targets for value in remote.recv()]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(self._get_indices(indices))
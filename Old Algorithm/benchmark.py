@@ -0,0 +1,198 @@
+import time
+import math
+from copy import deepcopy
+import minimaxAI
+from minimaxAI import *
+from parallelSearch import ParallelSearch
+from iterativeDeepening import iterativeDeepening
+
+# Positions written as FEN style rows, upper case is white, row 0 is black's back rank
+benchmarkPositions = {
+    'start': ['rnbqkbnr', 'pppppppp', '........', '........', '........', '........', 'PPPPPPPP', 'RNBKQBNR'],
+    'openGame': ['r.bqkb.r', 'pppp.ppp', '..n..n..', '....p...', '..B.P...', '.....N..', 'PPPP.PPP', 'RNBKQ..R'],
+    'middlegame': ['r...k..r', 'pp..qppp', '..n.bn..', '..bpp...', '....P...', '..NP.N..', 'PPP.BPPP', 'R.BK.Q.R'],
+}
+
+def boardFromRows(rows):
+    # Names follow the ones the Board class uses: 'pW', 'pW1'.. and 'rW', 'rW2'..
+    counts = {}
+    board = []
+    for row in rows:
+        boardRow = []
+        for char in row:
+            if char == '.':
+                boardRow.append('--')
+                continue
+
+            name = char.lower() + ('W' if char.isupper() else 'B')
+            n = counts.get(name, 0)
+            counts[name] = n + 1
+
+            if n == 0: boardRow.append(name)
+            elif name[0] == 'p': boardRow.append(name + str(n))
+            else: boardRow.append(name + str(n + 1))
+
+        board.append(boardRow)
+
+    return board
+
+# The search as it was before make/unmake, kept as the baseline
+def legacyMinimax(board, depth, alpha, beta, maximizingPlayer, color, stats):
+    stats['nodes'] += 1
+
+    if depth == 0 or isWon(board, 'kW') or isWon(board, 'kB'):
+        if isWon(board, 'kB'): return (None, -math.inf, None)
+        elif isWon(board, 'kW'): return (None, math.inf, None)
+        else: return (None, evaluation(board), None)
+
+    validMoves = findPossibleMoves(board, color)
+    value = -math.inf if maximizingPlayer else math.inf
+    column = bestPiece = None
+
+    for p in validMoves:
+        for move in validMoves[p]:
+            bCopy = simulateMove(deepcopy(board), p, move)
+            newScore = legacyMinimax(bCopy, depth - 1, alpha, beta, not maximizingPlayer, 'W' if color == 'B' else 'B', stats)[1]
+
+            if maximizingPlayer and newScore > value or not maximizingPlayer and newScore < value:
+                value, column, bestPiece = newScore, move, p
+
+            if maximizingPlayer: alpha = max(alpha, value)
+            else: beta = min(beta, value)
+            if alpha >= beta or maximizingPlayer and value > 9000: return (column, value, bestPiece)
+
+    return (column, value, bestPiece)
+
+def runSearch(searchFunction, rows, depth):
+    board = boardFromRows(rows)
+
+    start = time.perf_counter()
+    nodes = searchFunction(board, depth)
+    elapsed = time.perf_counter() - start
+
+    return nodes, elapsed
+
+def legacySearch(board, depth):
+    stats = {'nodes': 0}
+    legacyMinimax(board, depth, -math.inf, math.inf, True, 'B', stats)
+    return stats['nodes']
+
+def makeUnmakeSearch(board, depth):
+    minimaxAI.transpositionTable.clear()
+    searchStats['nodes'] = 0
+    minimax(board, depth, -math.inf, math.inf, True, 'B')
+    return searchStats['nodes']
+
+def benchmarkMakeUnmake(depth=3):
+    # The legacy search has no quiescence, leave it out for a fair comparison
+    minimaxAI.quiescenceSearch.enabled = False
+
+    print(f'{"position":<12} {"search":<12} {"nodes":>8} {"seconds":>8} {"nps":>9}')
+    for name, rows in benchmarkPositions.items():
+        for label, searchFunction in (('deepcopy', legacySearch), ('makeUnmake', makeUnmakeSearch)):
+            nodes, elapsed = runSearch(searchFunction, rows, depth)
+            print(f'{name:<12} {label:<12} {nodes:>8} {elapsed:>8.3f} {nodes / elapsed:>9.0f}')
+
+    minimaxAI.quiescenceSearch.enabled = True
+
+def benchmarkMoveOrdering(depths=(4, 5)):
+    print(f'{"position":<12} {"depth":>5} {"ordering":<9} {"nodes":>9} {"seconds":>8} {"firstCut":>8}')
+    for name, rows in benchmarkPositions.items():
+        for depth in depths:
+            for enabled in (False, True):
+                minimaxAI.moveOrderer.clear()
+                minimaxAI.moveOrderer.enabled = enabled
+                nodes, elapsed = runSearch(makeUnmakeSearch, rows, depth)
+                rate = minimaxAI.moveOrderer.stats()['firstMoveCutoffRate']
+                print(f'{name:<12} {depth:>5} {"on" if enabled else "off":<9} {nodes:>9} {elapsed:>8.2f} {rate:>8.1%}')
+
+    minimaxAI.moveOrderer.enabled = True
+
+def benchmarkQuiescence(depth=3):
+    print(f'{"position":<12} {"quiescence":<10} {"nodes":>8} {"qnodes":>8} {"seconds":>8}  best move')
+    for name, rows in benchmarkPositions.items():
+        for enabled in (False, True):
+            minimaxAI.quiescenceSearch.clear()
+            minimaxAI.quiescenceSearch.enabled = enabled
+            minimaxAI.transpositionTable.clear()
+            searchStats['nodes'] = 0
+
+            start = time.perf_counter()
+            column, value, bestPiece = minimax(boardFromRows(rows), depth, -math.inf, math.inf, True, 'B')
+            elapsed = time.perf_counter() - start
+
+            qnodes = minimaxAI.quiescenceSearch.nodes
+            print(f'{name:<12} {"on" if enabled else "off":<10} {searchStats["nodes"]:>8} {qnodes:>8} {elapsed:>8.2f}  {bestPiece} {column} ({value})')
+
+    minimaxAI.quiescenceSearch.enabled = True
+
+def benchmarkParallel(depth=4, workerCounts=(1, 2, 4, 8, 16)):
+    print(f'{"position":<12} {"workers":>7} {"nodes":>9} {"seconds":>8} {"speedup":>8}  best move')
+    for name, rows in benchmarkPositions.items():
+        baseline = None
+        for workers in workerCounts:
+            searcher = ParallelSearch(workers)
+
+            start = time.perf_counter()
+            column, value, bestPiece = searcher.search(boardFromRows(rows), depth, 'B')
+            elapsed = time.perf_counter() - start
+            searcher.close()
+
+            if baseline is None: baseline = elapsed
+            print(f'{name:<12} {workers:>7} {searcher.nodes:>9} {elapsed:>8.2f} {baseline / elapsed:>7.2f}x  {bestPiece} {column} ({value})')
+
+def benchmarkSearchCore(depth=5):
+    # Same iterative deepening run with plain alpha-beta, PVS, and PVS with aspiration windows
+    settings = (('alphaBeta', False, False), ('pvs', True, False), ('pvs+aspiration', True, True))
+
+    print(f'{"position":<12} {"search":<15} {"nodes":>9} {"seconds":>8}  best move')
+    for name, rows in benchmarkPositions.items():
+        for label, pvs, aspiration in settings:
+            minimaxAI.searchOptions['pvs'] = pvs
+            minimaxAI.searchOptions['aspiration'] = aspiration
+            minimaxAI.transpositionTable.clear()
+            minimaxAI.moveOrderer.clear()
+
+            nodes = []
+            start = time.perf_counter()
+            column, value, bestPiece = iterativeDeepening(boardFromRows(rows), 10 ** 9, 'B', maxDepth=depth, report=lambda info: nodes.append(info['nodes']))
+            elapsed = time.perf_counter() - start
+
+            print(f'{name:<12} {label:<15} {sum(nodes):>9} {elapsed:>8.2f}  {bestPiece} {column} ({value})')
+
+    minimaxAI.searchOptions['pvs'] = True
+    minimaxAI.searchOptions['aspiration'] = True
+
+def benchmarkSelectiveSearch(depth=5):
+    # Fixed depth node counts with each pruning feature on its own and all together
+    settings = (
+        ('none', False, False, False),
+        ('nullMove', True, False, False),
+        ('lmr', False, True, False),
+        ('futility', False, False, True),
+        ('all', True, True, True),
+    )
+
+    print(f'{"position":<12} {"pruning":<10} {"nodes":>9} {"seconds":>8}  best move')
+    for name, rows in benchmarkPositions.items():
+        for label, nullMove, lmr, futility in settings:
+            minimaxAI.searchOptions.update({'nullMove': nullMove, 'lmr': lmr, 'futility': futility})
+            minimaxAI.transpositionTable.clear()
+            minimaxAI.moveOrderer.clear()
+
+            nodes = []
+            start = time.perf_counter()
+            column, value, bestPiece = iterativeDeepening(boardFromRows(rows), 10 ** 9, 'B', maxDepth=depth, report=lambda info: nodes.append(info['nodes']))
+            elapsed = time.perf_counter() - start
+
+            print(f'{name:<12} {label:<10} {sum(nodes):>9} {elapsed:>8.2f}  {bestPiece} {column} ({value})')
+
+    minimaxAI.searchOptions.update({'nullMove': True, 'lmr': True, 'futility': True})
+
+if __name__ == '__main__':
+    benchmarkMakeUnmake()
+    benchmarkMoveOrdering()
+    benchmarkQuiescence()
+    benchmarkParallel()
+    benchmarkSearchCore()
+    benchmarkSelectiveSearch()
@@ -0,0 +1,414 @@
+import random
+
+# Squares are numbered like BitboardChess: a1 = 0, h1 = 7, a8 = 56, h8 = 63
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+WHITE, BLACK = 0, 1
+
+# Piece index = kind + 6 * color, so 0..5 are white and 6..11 black
+pieceChars = 'PNBRQKpnbrqk'
+
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+
+# Move flags
+EN_PASSANT, CASTLING, DOUBLE_PUSH = 1, 2, 4
+
+startFen = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+def encodeMove(start, to, promotion=0, flags=0):
+    return start | to << 6 | promotion << 12 | flags << 16
+
+def moveFrom(move): return move & 63
+def moveTo(move): return (move >> 6) & 63
+def movePromotion(move): return (move >> 12) & 7
+def moveFlags(move): return move >> 16
+
+def squareName(sq):
+    return 'abcdefgh'[sq % 8] + str(sq // 8 + 1)
+
+def moveToUci(move):
+    uci = squareName(moveFrom(move)) + squareName(moveTo(move))
+    if movePromotion(move): uci += 'nbrq'[movePromotion(move) - 1]
+    return uci
+
+def lsb(bb):
+    return (bb & -bb).bit_length() - 1
+
+def popCount(bb):
+    return bin(bb).count('1')
+
+def squares(bb):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+###############################################################################
+# Attack tables, same offsets as knightAttacks/kingAttacks in MoveGenerator.cs
+###############################################################################
+def leaperAttacks(sq, offsets):
+    mask = 0
+    rank, file = divmod(sq, 8)
+    for dRank, dFile in offsets:
+        r2, f2 = rank + dRank, file + dFile
+        if 0 <= r2 < 8 and 0 <= f2 < 8: mask |= 1 << (r2 * 8 + f2)
+    return mask
+
+knightOffsets = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+kingOffsets = [(dr, df) for dr in (-1, 0, 1) for df in (-1, 0, 1) if dr or df]
+
+knightAttacks = [leaperAttacks(sq, knightOffsets) for sq in range(64)]
+kingAttacks = [leaperAttacks(sq, kingOffsets) for sq in range(64)]
+pawnAttacks = [
+    [leaperAttacks(sq, [(1, -1), (1, 1)]) for sq in range(64)],
+    [leaperAttacks(sq, [(-1, -1), (-1, 1)]) for sq in range(64)],
+]
+
+# Rays run to the edge of the board. For directions that increase the square
+# index the nearest blocker is the lowest set bit, otherwise the highest.
+directions = {'N': (1, 0), 'S': (-1, 0), 'E': (0, 1), 'W': (0, -1), 'NE': (1, 1), 'NW': (1, -1), 'SE': (-1, 1), 'SW': (-1, -1)}
+
+def buildRay(sq, dRank, dFile):
+    mask = 0
+    rank, file = divmod(sq, 8)
+    rank, file = rank + dRank, file + dFile
+    while 0 <= rank < 8 and 0 <= file < 8:
+        mask |= 1 << (rank * 8 + file)
+        rank, file = rank + dRank, file + dFile
+    return mask
+
+rays = {name: [buildRay(sq, dr, df) for sq in range(64)] for name, (dr, df) in directions.items()}
+
+rookPositive = [rays['N'], rays['E']]
+rookNegative = [rays['S'], rays['W']]
+bishopPositive = [rays['NE'], rays['NW']]
+bishopNegative = [rays['SE'], rays['SW']]
+
+def slidingAttacks(sq, occ, positive, negative):
+    attacks = 0
+    for table in positive:
+        ray = table[sq]
+        blockers = ray & occ
+        if blockers: ray ^= table[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for table in negative:
+        ray = table[sq]
+        blockers = ray & occ
+        if blockers: ray ^= table[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+def rookAttacks(sq, occ):
+    return slidingAttacks(sq, occ, rookPositive, rookNegative)
+
+def bishopAttacks(sq, occ):
+    return slidingAttacks(sq, occ, bishopPositive, bishopNegative)
+
+def queenAttacks(sq, occ):
+    return rookAttacks(sq, occ) | bishopAttacks(sq, occ)
+
+# Castling rights that survive a move touching the square
+castleMask = [15] * 64
+castleMask[0] = 15 & ~WHITE_QUEENSIDE
+castleMask[7] = 15 & ~WHITE_KINGSIDE
+castleMask[4] = 15 & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+castleMask[56] = 15 & ~BLACK_QUEENSIDE
+castleMask[63] = 15 & ~BLACK_KINGSIDE
+castleMask[60] = 15 & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+
+# King destination -> rook (from, to)
+castleRookMoves = {6: (7, 5), 2: (0, 3), 62: (63, 61), 58: (56, 59)}
+
+rng = random.Random(0xB17B0A4D)
+pieceSquareKeys = [[rng.getrandbits(64) for sq in range(64)] for p in range(12)]
+castlingKeys = [rng.getrandbits(64) for rights in range(16)]
+enPassantKeys = [rng.getrandbits(64) for file in range(8)]
+blackToMoveKey = rng.getrandbits(64)
+
+###############################################################################
+# Position
+###############################################################################
+class Position:
+    def __init__(self, fen=startFen):
+        self.setFen(fen)
+
+    def clear(self):
+        self.pieces = [0] * 12
+        self.occupancy = [0, 0]
+        self.squares = [-1] * 64
+        self.whiteToMove = True
+        self.castlingRights = 0
+        self.enPassantSquare = -1
+        self.halfmoveClock = 0
+        self.fullmoveNumber = 1
+        self.hashKey = 0
+        self.history = []
+
+    def setFen(self, fen):
+        self.clear()
+        fields = fen.split()
+
+        for i, rankText in enumerate(fields[0].split('/')):
+            sq = (7 - i) * 8
+            for char in rankText:
+                if char.isdigit(): sq += int(char)
+                else:
+                    self.putPiece(pieceChars.index(char), sq)
+                    sq += 1
+
+        self.whiteToMove = len(fields) < 2 or fields[1] == 'w'
+        if len(fields) > 2:
+            for char, right in (('K', WHITE_KINGSIDE), ('Q', WHITE_QUEENSIDE), ('k', BLACK_KINGSIDE), ('q', BLACK_QUEENSIDE)):
+                if char in fields[2]: self.castlingRights |= right
+        if len(fields) > 3 and fields[3] != '-':
+            self.enPassantSquare = 'abcdefgh'.index(fields[3][0]) + 8 * (int(fields[3][1]) - 1)
+        if len(fields) > 4: self.halfmoveClock = int(fields[4])
+        if len(fields) > 5: self.fullmoveNumber = int(fields[5])
+
+        self.hashKey = self.computeHash()
+
+    def fen(self):
+        rankTexts = []
+        for rank in range(7, -1, -1):
+            text, empty = '', 0
+            for file in range(8):
+                p = self.squares[rank * 8 + file]
+                if p == -1:
+                    empty += 1
+                    continue
+                if empty: text += str(empty)
+                text += pieceChars[p]
+                empty = 0
+            if empty: text += str(empty)
+            rankTexts.append(text)
+
+        castling = ''.join(char for char, right in (('K', WHITE_KINGSIDE), ('Q', WHITE_QUEENSIDE), ('k', BLACK_KINGSIDE), ('q', BLACK_QUEENSIDE)) if self.castlingRights & right)
+        enPassant = squareName(self.enPassantSquare) if self.enPassantSquare != -1 else '-'
+
+        return f"{'/'.join(rankTexts)} {'w' if self.whiteToMove else 'b'} {castling or '-'} {enPassant} {self.halfmoveClock} {self.fullmoveNumber}"
+
+    def computeHash(self):
+        key = 0
+        for sq in range(64):
+            if self.squares[sq] != -1: key ^= pieceSquareKeys[self.squares[sq]][sq]
+        key ^= castlingKeys[self.castlingRights]
+        if self.enPassantSquare != -1: key ^= enPassantKeys[self.enPassantSquare % 8]
+        if not self.whiteToMove: key ^= blackToMoveKey
+        return key
+
+    def copy(self):
+        other = Position.__new__(Position)
+        other.pieces = self.pieces[:]
+        other.occupancy = self.occupancy[:]
+        other.squares = self.squares[:]
+        other.whiteToMove = self.whiteToMove
+        other.castlingRights = self.castlingRights
+        other.enPassantSquare = self.enPassantSquare
+        other.halfmoveClock = self.halfmoveClock
+        other.fullmoveNumber = self.fullmoveNumber
+        other.hashKey = self.hashKey
+        other.history = []
+        return other
+
+    def putPiece(self, p, sq):
+        bit = 1 << sq
+        self.pieces[p] |= bit
+        self.occupancy[p // 6] |= bit
+        self.squares[sq] = p
+        self.hashKey ^= pieceSquareKeys[p][sq]
+
+    def removePiece(self, p, sq):
+        bit = 1 << sq
+        self.pieces[p] ^= bit
+        self.occupancy[p // 6] ^= bit
+        self.squares[sq] = -1
+        self.hashKey ^= pieceSquareKeys[p][sq]
+
+    def pieceAt(self, sq):
+        return self.squares[sq]
+
+    def allPieces(self):
+        return self.occupancy[WHITE] | self.occupancy[BLACK]
+
+    def kingSquare(self, color):
+        king = self.pieces[KING + 6 * color]
+        return lsb(king) if king else -1
+
+    def isSquareAttacked(self, sq, byWhite):
+        side = WHITE if byWhite else BLACK
+        base = 6 * side
+        occ = self.allPieces()
+
+        # Look outward from the square with each piece's own attack pattern
+        if pawnAttacks[1 - side][sq] & self.pieces[base + PAWN]: return True
+        if knightAttacks[sq] & self.pieces[base + KNIGHT]: return True
+        if kingAttacks[sq] & self.pieces[base + KING]: return True
+        if bishopAttacks(sq, occ) & (self.pieces[base + BISHOP] | self.pieces[base + QUEEN]): return True
+        if rookAttacks(sq, occ) & (self.pieces[base + ROOK] | self.pieces[base + QUEEN]): return True
+        return False
+
+    def inCheck(self):
+        side = WHITE if self.whiteToMove else BLACK
+        king = self.kingSquare(side)
+        return king != -1 and self.isSquareAttacked(king, not self.whiteToMove)
+
+    def isCapture(self, move):
+        return self.squares[moveTo(move)] != -1 or moveFlags(move) & EN_PASSANT != 0
+
+    ###########################################################################
+    # Move generation (pseudo-legal, see MoveGenerator.cs)
+    ###########################################################################
+    def generateMoves(self, capturesOnly=False):
+        moves = []
+        side = WHITE if self.whiteToMove else BLACK
+        base = 6 * side
+        own = self.occupancy[side]
+        enemy = self.occupancy[1 - side]
+        occ = own | enemy
+        targets = enemy if capturesOnly else ~own
+
+        self.generatePawnMoves(moves, side, enemy, occ, capturesOnly)
+
+        for sq in squares(self.pieces[base + KNIGHT]):
+            for to in squares(knightAttacks[sq] & targets): moves.append(sq | to << 6)
+        for sq in squares(self.pieces[base + BISHOP]):
+            for to in squares(bishopAttacks(sq, occ) & targets): moves.append(sq | to << 6)
+        for sq in squares(self.pieces[base + ROOK]):
+            for to in squares(rookAttacks(sq, occ) & targets): moves.append(sq | to << 6)
+        for sq in squares(self.pieces[base + QUEEN]):
+            for to in squares(queenAttacks(sq, occ) & targets): moves.append(sq | to << 6)
+        for sq in squares(self.pieces[base + KING]):
+            for to in squares(kingAttacks[sq] & targets): moves.append(sq | to << 6)
+
+        if not capturesOnly and self.castlingRights: self.generateCastling(moves, side, occ)
+
+        return moves
+
+    def generatePawnMoves(self, moves, side, enemy, occ, capturesOnly):
+        pawns = self.pieces[6 * side + PAWN]
+        forward = 8 if side == WHITE else -8
+        startRank = 1 if side == WHITE else 6
+        promotionRank = 7 if side == WHITE else 0
+
+        for sq in squares(pawns):
+            rank = sq // 8
+            targets = pawnAttacks[side][sq] & enemy
+            for to in squares(targets): self.addPawnMove(moves, sq, to, promotionRank, 0)
+
+            if self.enPassantSquare != -1 and pawnAttacks[side][sq] & (1 << self.enPassantSquare):
+                moves.append(encodeMove(sq, self.enPassantSquare, 0, EN_PASSANT))
+
+            if capturesOnly: continue
+
+            # Pawns from the string board can stand on the last rank unpromoted
+            to = sq + forward
+            if not 0 <= to < 64: continue
+
+            if not occ & (1 << to):
+                self.addPawnMove(moves, sq, to, promotionRank, 0)
+                if rank == startRank and not occ & (1 << (to + forward)):
+                    moves.append(encodeMove(sq, to + forward, 0, DOUBLE_PUSH))
+
+    def addPawnMove(self, moves, start, to, promotionRank, flags):
+        if to // 8 == promotionRank:
+            for promotion in (QUEEN, ROOK, BISHOP, KNIGHT): moves.append(encodeMove(start, to, promotion, flags))
+        else:
+            moves.append(encodeMove(start, to, 0, flags))
+
+    def generateCastling(self, moves, side, occ):
+        byWhite = side == BLACK
+        if side == WHITE:
+            rights = ((WHITE_KINGSIDE, 4, 6, (5, 6), (4, 5, 6)), (WHITE_QUEENSIDE, 4, 2, (1, 2, 3), (4, 3, 2)))
+        else:
+            rights = ((BLACK_KINGSIDE, 60, 62, (61, 62), (60, 61, 62)), (BLACK_QUEENSIDE, 60, 58, (57, 58, 59), (60, 59, 58)))
+
+        for right, start, to, empty, safe in rights:
+            if not self.castlingRights & right: continue
+            if any(occ & (1 << sq) for sq in empty): continue
+            if any(self.isSquareAttacked(sq, byWhite) for sq in safe): continue
+            moves.append(encodeMove(start, to, 0, CASTLING))
+
+    def legalMoves(self):
+        legal = []
+        for move in self.generateMoves():
+            self.makeMove(move)
+            if not self.leftInCheck(): legal.append(move)
+            self.unmakeMove()
+        return legal
+
+    def leftInCheck(self):
+        # After makeMove: is the side that just moved exposing its king?
+        mover = BLACK if self.whiteToMove else WHITE
+        king = self.kingSquare(mover)
+        return king != -1 and self.isSquareAttacked(king, self.whiteToMove)
+
+    ###########################################################################
+    # Make / unmake
+    ###########################################################################
+    def makeMove(self, move):
+        start, to = move & 63, (move >> 6) & 63
+        promotion, flags = (move >> 12) & 7, move >> 16
+        piece = self.squares[start]
+        captured = self.squares[to]
+        white = self.whiteToMove
+
+        self.history.append((move, captured, self.castlingRights, self.enPassantSquare, self.halfmoveClock, self.hashKey))
+
+        if flags & EN_PASSANT:
+            captured = BLACK * 6 + PAWN if white else PAWN
+            self.removePiece(captured, to - 8 if white else to + 8)
+        elif captured != -1:
+            self.removePiece(captured, to)
+
+        self.removePiece(piece, start)
+        self.putPiece(piece - piece % 6 + promotion if promotion else piece, to)
+
+        if flags & CASTLING:
+            rookFrom, rookTo = castleRookMoves[to]
+            rook = ROOK if white else BLACK * 6 + ROOK
+            self.removePiece(rook, rookFrom)
+            self.putPiece(rook, rookTo)
+
+        if self.enPassantSquare != -1: self.hashKey ^= enPassantKeys[self.enPassantSquare % 8]
+        self.enPassantSquare = (start + to) // 2 if flags & DOUBLE_PUSH else -1
+        if self.enPassantSquare != -1: self.hashKey ^= enPassantKeys[self.enPassantSquare % 8]
+
+        rights = self.castlingRights & castleMask[start] & castleMask[to]
+        if rights != self.castlingRights:
+            self.hashKey ^= castlingKeys[self.castlingRights] ^ castlingKeys[rights]
+            self.castlingRights = rights
+
+        self.halfmoveClock = 0 if piece % 6 == PAWN or captured != -1 else self.halfmoveClock + 1
+        if not white: self.fullmoveNumber += 1
+
+        self.whiteToMove = not white
+        self.hashKey ^= blackToMoveKey
+
+    def unmakeMove(self):
+        move, captured, castlingRights, enPassantSquare, halfmoveClock, hashKey = self.history.pop()
+        start, to = move & 63, (move >> 6) & 63
+        promotion, flags = (move >> 12) & 7, move >> 16
+
+        self.whiteToMove = not self.whiteToMove
+        white = self.whiteToMove
+        if not white: self.fullmoveNumber -= 1
+
+        moved = self.squares[to]
+        self.removePiece(moved, to)
+        self.putPiece(moved - promotion + PAWN if promotion else moved, start)
+
+        if flags & EN_PASSANT:
+            self.putPiece(BLACK * 6 + PAWN if white else PAWN, to - 8 if white else to + 8)
+        elif captured != -1:
+            self.putPiece(captured, to)
+
+        if flags & CASTLING:
+            rookFrom, rookTo = castleRookMoves[to]
+            rook = ROOK if white else BLACK * 6 + ROOK
+            self.removePiece(rook, rookTo)
+            self.putPiece(rook, rookFrom)
+
+        self.castlingRights = castlingRights
+        self.enPassantSquare = enPassantSquare
+        self.halfmoveClock = halfmoveClock
+        self.hashKey = hashKey
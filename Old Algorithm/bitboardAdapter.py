@@ -0,0 +1,72 @@
+from bitboard import *
+
+# Converts between the Board class' 8x8 string board and bitboard.Position.
+# Row 0 of the string board is black's back rank (rank 8), column 0 is the a-file.
+
+kinds = 'pnbrqk'
+
+def toSquare(row, col):
+    return (7 - row) * 8 + col
+
+def toRowCol(sq):
+    return [7 - sq // 8, sq % 8]
+
+def toPosition(board, color):
+    position = Position('8/8/8/8/8/8/8/8 w - - 0 1')
+    names = {}
+
+    for r in range(len(board)):
+        for c in range(len(board[r])):
+            name = board[r][c].replace('v', '')
+            if name == '--': continue
+
+            sq = toSquare(r, c)
+            position.putPiece(kinds.index(name[0]) + (6 if name[1] == 'B' else 0), sq)
+            names[sq] = name
+
+    position.whiteToMove = color == 'W'
+    position.hashKey = position.computeHash()
+
+    return position, names
+
+def pieceName(p, counts):
+    # Same naming as the Board class: 'pW', 'pW1'.. for pawns, 'rW', 'rW2'.. otherwise
+    name = kinds[p % 6] + ('B' if p >= 6 else 'W')
+    n = counts.get(name, 0)
+    counts[name] = n + 1
+
+    if n == 0: return name
+    if name[0] == 'p': return name + str(n)
+    return name + str(n + 1)
+
+def toStringBoard(position, names=None):
+    board = [['--'] * 8 for r in range(8)]
+    counts = {}
+
+    for row in range(8):
+        for col in range(8):
+            p = position.pieceAt(toSquare(row, col))
+            if p == -1: continue
+
+            if names is not None and toSquare(row, col) in names: board[row][col] = names[toSquare(row, col)]
+            else: board[row][col] = pieceName(p, counts)
+
+    return board
+
+def findPossibleMoves(board, color):
+    position, names = toPosition(board, color)
+    validMoves = {}
+
+    for sq, name in names.items():
+        if name[1] == color: validMoves[name] = []
+
+    # The string board has no promotion piece, so the four promotions collapse into one move
+    for move in position.generateMoves():
+        moves = validMoves[names[moveFrom(move)]]
+        destination = toRowCol(moveTo(move))
+        if destination not in moves: moves.append(destination)
+
+    return validMoves
+
+def findValidMoves(piece, row, col, board):
+    return findPossibleMoves(board, piece[1]).get(board[row][col], [])
@@ -19,5 +19,3 @@ listOfMovesB = [[1, -1], [1, 1], [-1, -1], [-1, 1]]
 listOfMovesQ = [[1, -1], [1, 1], [-1, -1], [-1, 1], [1, 0], [0, 1], [-1, 0], [0, -1]]
 listOfMovesPW = [[-1, 0], [-1, 1], [-1, -1]]
 listOfMovesPB = [[1, 0], [1, -1], [1, 1]]
-
-pawnsMoved = []
@@ -0,0 +1,90 @@
+import time
+import math
+from minimaxAI import *
+
+# Half width of the first aspiration window, in centipawns
+aspirationWindow = 50
+
+def fallbackMove(board, color):
+    # Something legal to play if not even depth 1 finishes in time
+    for piece, moves in generateMoves(SearchBoard(board, color), color).items():
+        if moves: return (moves[0], None, piece)
+
+    return (None, None, None)
+
+def printIteration(info):
+    line = ' '.join(f'{piece}{move}' for piece, move in info['pv'])
+    print(f"depth {info['depth']:>2}  nodes {info['nodes']:>8}  qnodes {info['qnodes']:>8}  time {info['timeMs']:>7.0f}ms  score {info['score']}  pv {line}")
+
+def aspirationSearch(board, depth, color, previousScore, deadline, pvLine, stopEvent):
+    # Search a narrow window around the last iteration's score and widen
+    # whichever side failed until the score lands inside it
+    maximizingPlayer = color == 'B'
+    alpha, beta = -math.inf, math.inf
+    delta = aspirationWindow
+    researches = 0
+
+    if searchOptions['aspiration'] and previousScore is not None and not math.isinf(previousScore):
+        alpha, beta = previousScore - delta, previousScore + delta
+
+    while True:
+        result = minimax(board, depth, alpha, beta, maximizingPlayer, color, deadline, pvLine, stopEvent)
+        value = result[1]
+
+        if value <= alpha and alpha != -math.inf:
+            delta *= 4
+            alpha = previousScore - delta if delta < 1000 else -math.inf
+        elif value >= beta and beta != math.inf:
+            delta *= 4
+            beta = previousScore + delta if delta < 1000 else math.inf
+        else:
+            return result, researches
+
+        researches += 1
+
+def iterativeDeepening(board, timeLimitMs, color='B', maxDepth=64, report=printIteration, stopEvent=None):
+    startTime = time.perf_counter()
+    deadline = startTime + timeLimitMs / 1000
+
+    bestMove = fallbackMove(board, color)
+    previousScore = None
+    pvLine = []
+    iterations = []
+
+    for depth in range(1, maxDepth + 1):
+        if time.perf_counter() > deadline: break
+        if stopEvent is not None and stopEvent.is_set(): break
+
+        for key in searchStats: searchStats[key] = 0
+        quiescenceNodes = quiescenceSearch.nodes
+        iterationStart = time.perf_counter()
+
+        try:
+            result, researches = aspirationSearch(board, depth, color, previousScore, deadline, pvLine, stopEvent)
+        except SearchTimeout:
+            break
+
+        if result[2] is not None: bestMove = result
+        previousScore = result[1]
+        pvLine = principalVariation(board, color, depth)
+
+        info = {
+            'depth': depth,
+            'nodes': searchStats['nodes'],
+            'qnodes': quiescenceSearch.nodes - quiescenceNodes,
+            'pvsResearches': searchStats['pvsResearches'],
+            'aspirationResearches': researches,
+            'timeMs': (time.perf_counter() - iterationStart) * 1000,
+            'score': result[1],
+            'pv': pvLine,
+        }
+        iterations.append(info)
+        if report is not None: report(info)
+
+        # A forced king capture was found, searching deeper will not change it
+        if math.isinf(result[1]): break
+
+    searchLimits['deadline'] = None
+    searchLimits['stop'] = None
+
+    return bestMove
@@ -3,11 +3,16 @@ from constants import *
 from boardClass import *
 from piece import *
 from minimaxAI import *
+from searchThread import *
 
 pygame.init()
 
 played = False
 
+# How long the computer may think about each move
+thinkTimeMs = 2000
+FPS = 60
+
 win = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption('Chess AI') 	
 
@@ -18,16 +23,27 @@ def redrawWindow():
 	b.update(win)
 	pygame.display.flip()
 
+clock = pygame.time.Clock()
+searchHandle = None
+
 run = True
 while run:
 	for event in pygame.event.get():
 		if event.type == pygame.QUIT: run = False
 		
-		if event.type == pygame.MOUSEBUTTONDOWN: 
+		# The board belongs to the search thread while the computer is thinking
+		if event.type == pygame.MOUSEBUTTONDOWN and searchHandle is None: 
 			b.move(event.pos, False, None)
 			redrawWindow()
-		if b.color == 'B':
-			col, value, bP = minimax(b.board, 4, -math.inf, math.inf, True, 'B')
-			b.move(col, True, bP)
+
+	if b.color == 'B' and searchHandle is None: searchHandle = SearchHandle(b.board, thinkTimeMs, 'B')
+
+	if searchHandle is not None and searchHandle.done():
+		col, value, bP = searchHandle.result
+		b.move(col, True, bP)
+		searchHandle = None
 
 	redrawWindow()
+	clock.tick(FPS)
+
+if searchHandle is not None: searchHandle.cancel()
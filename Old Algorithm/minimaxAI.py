@@ -2,29 +2,44 @@ import pygame
 import random
 from piece import *
 import math
-from copy import deepcopy
+import time
+from transpositionTable import *
+from searchBoard import *
+from evaluation import *
+import bitboardAdapter
+from moveOrdering import *
+from quiescence import *
+from moveCache import *
+
+# 'strings' uses piece.findValidMoves, 'bitboard' goes through bitboardAdapter
+moveBackend = 'strings'
+
+transpositionTable = TranspositionTable(32)
+moveOrderer = MoveOrderer()
+# Off by default: the transposition table already cuts most repeated positions
+# before their moves are generated, so within one search the hit rate is low
+moveCache = MoveCache(50000, enabled=False)
+
+searchStats = {'nodes': 0, 'pvsResearches': 0, 'nullMoveCutoffs': 0, 'reductions': 0, 'lmrResearches': 0, 'futilityPruned': 0}
+
+# Switches for the search features, mostly there to measure them
+searchOptions = {'pvs': True, 'aspiration': True, 'nullMove': True, 'lmr': True, 'futility': True}
+
+# Selective search settings
+nullMoveMinDepth = 3
+lmrMinDepth = 3
+lmrMinMove = 3
+# How far below alpha the static evaluation has to be, by remaining depth,
+# before quiet moves are not worth searching
+futilityMargins = {1: 200, 2: 500}
+
+# Absolute time.perf_counter() value after which the search gives up, and an
+# optional threading.Event another thread can set to stop it
+searchLimits = {'deadline': None, 'stop': None}
+
+class SearchTimeout(Exception):
+    pass
 
-transpositionTable = {}
-
-def evaluation(board):
-    score = 0
-    for r in range(len(board)):
-        for c in range(len(board[r])):
-            if 'pW' in board[r][c]: score -= 10
-            if 'nW' in board[r][c] or 'bW' in board[r][c]: score -= 30
-            if 'rW' in board[r][c]: score -= 50
-            if 'qW' in board[r][c]: score -= 90
-
-            if board[r][c] == 'kW': score -= 10000
-
-            if 'pB' in board[r][c]: score += 10
-            if 'nB' in board[r][c] or 'bB' in board[r][c]: score += 30
-            if 'rB' in board[r][c]: score += 50
-            if 'qB' in board[r][c]: score += 90
-
-            if board[r][c] == 'kB': score += 10000
-
-    return score
 def findPossibleMoves(board, color):
     validMoves = {}
     for row in range(len(board)):
@@ -54,63 +69,176 @@ def simulateMove(board, piece, move):
 
     return board
 
-def minimax(board, depth , alpha, beta, maximizingPlayer, color):
-
-    if depth == 0 or isWon(board, 'kW') or isWon(board, 'kB'):
-        if isWon(board, 'kB'):
-            return (None, -math.inf, None)
-        elif isWon(board, 'kW'):
-            return (None, math.inf, None)
-        else:
-            return (None, evaluation(board), None)
-
-
-    validMoves = findPossibleMoves(board, color)
-
-    if maximizingPlayer:
-        value = -math.inf
-        column = None
-        for piece in validMoves:
-            breakNow = False
-            for move in validMoves[piece]:
-                bCopy = deepcopy(board)
-                bCopy = simulateMove(bCopy, piece, move)
-                newScore = (minimax(bCopy, depth - 1, alpha, beta, False, 'W'))[1]
-                if newScore > value:
-                    value = newScore
-                    column = move
-                    bestPiece = piece
-                alpha = max(alpha, value)       
-                if alpha >= beta:
-                    breakNow = True
-                    break
-
-                if value > 9000:
-                    breakNow = True
-                    break
-
-            if breakNow == True: break
-
-        return (column, value, bestPiece)
-    
+def generateMoves(pos, color):
+    # Move generation only depends on the board and side to move, which is
+    # exactly what the hash key covers
+    useCache = moveCache.enabled and color == pos.color
+    if useCache:
+        validMoves = moveCache.get(pos)
+        if validMoves is not None: return validMoves
+
+    if moveBackend == 'bitboard':
+        validMoves = bitboardAdapter.findPossibleMoves(pos.board, color)
     else:
-        value = math.inf
-        column = None
-        for piece in validMoves:
-            breakNow = False
-            for move in validMoves[piece]:
-                bCopy = deepcopy(board)
-                bCopy = simulateMove(bCopy, piece, move)
-                newScore = (minimax(bCopy, depth - 1, alpha, beta, True, 'B'))[1]
-                if newScore < value:
-                    value = newScore
-                    column = move
-                    bestPiece = piece
-                beta = min(beta, value)
-                if alpha >= beta:
-                    breakNow = True
-                    break
-
-            if breakNow == True: break
-
-        return (column, value, bestPiece)
+        validMoves = {}
+        for piece, (row, col) in pos.pieces(color):
+            validMoves[piece] = findValidMoves(piece, row, col, pos.board)
+
+    if useCache: moveCache.put(pos, validMoves)
+
+    return validMoves
+
+quiescenceSearch = QuiescenceSearch(SearchBoard.evaluate, generateMoves, pieceValues)
+
+def minimax(board, depth , alpha, beta, maximizingPlayer, color, deadline=None, pvLine=(), stopEvent=None):
+    transpositionTable.newSearch()
+    moveOrderer.newSearch()
+    searchLimits['deadline'] = deadline
+    searchLimits['stop'] = stopEvent
+
+    # The caller's window and the returned value stay from black's point of
+    # view (black maximizes), the search itself works for the side to move
+    sign = 1 if color == 'B' else -1
+    if sign == -1: alpha, beta = -beta, -alpha
+
+    column, value, bestPiece = search(SearchBoard(board, color), depth, alpha, beta, tuple(pvLine))
+
+    return (column, sign * value, bestPiece)
+
+def checkLimits():
+    if searchLimits['deadline'] is not None and time.perf_counter() > searchLimits['deadline']: raise SearchTimeout()
+    if searchLimits['stop'] is not None and searchLimits['stop'].is_set(): raise SearchTimeout()
+
+def wonScore(pos):
+    # Score of a finished game for the side to move
+    if pos.isWon('kW'): return math.inf if pos.color == 'B' else -math.inf
+    if pos.isWon('kB'): return math.inf if pos.color == 'W' else -math.inf
+    return None
+
+def search(pos, depth, alpha, beta, pvLine=()):
+    searchStats['nodes'] += 1
+    if searchStats['nodes'] & 255 == 0: checkLimits()
+
+    score = wonScore(pos)
+    if score is not None: return (None, score, None)
+
+    if depth == 0:
+        if quiescenceSearch.enabled: return (None, quiescenceSearch.search(pos, alpha, beta), None)
+        return (None, pos.evaluate() if pos.color == 'B' else -pos.evaluate(), None)
+
+    # No cutoffs at the root, the stored move may name a piece that only
+    # hashes the same (two knights that swapped squares)
+    entry = transpositionTable.probe(pos.hashKey)
+    if entry is not None and entry.depth >= depth and pos.history:
+        if entry.flag == EXACT: return (entry.move, entry.score, entry.piece)
+        if entry.flag == BETA: alpha = max(alpha, entry.score)
+        if entry.flag == ALPHA: beta = min(beta, entry.score)
+        if alpha >= beta: return (entry.move, entry.score, entry.piece)
+
+    staticEval = pos.evaluate() if pos.color == 'B' else -pos.evaluate()
+
+    # Null move: let the opponent move twice, if that still fails high the
+    # real moves will too. Not twice in a row, and not without pieces since
+    # in pawn endings passing may be the best move (zugzwang). In check the
+    # king just gets captured and the null search fails low on its own.
+    if (searchOptions['nullMove'] and depth >= nullMoveMinDepth and pos.history and beta != math.inf
+            and staticEval >= beta and not pos.lastMoveWasNull() and pos.hasPieces(pos.color)):
+        reduction = 3 if depth >= 6 else 2
+        pos.makeNullMove()
+        nullScore = -search(pos, max(0, depth - 1 - reduction), -beta, -beta + 1)[1]
+        pos.unmakeMove()
+
+        if nullScore >= beta:
+            searchStats['nullMoveCutoffs'] += 1
+            return (None, beta if nullScore == math.inf else nullScore, None)
+
+    # Near the leaves a quiet move will not make up a big deficit
+    futile = (searchOptions['futility'] and depth in futilityMargins and pos.history
+              and alpha != -math.inf and staticEval + futilityMargins[depth] <= alpha)
+
+    ply = len(pos.history)
+    ttMove = (entry.piece, entry.move) if entry is not None and entry.piece is not None else None
+    pvMove = pvLine[0] if pvLine else None
+    moveList = moveOrderer.orderMoves(pos.board, generateMoves(pos, pos.color), ply, ttMove, pvMove)
+
+    alphaOrig = alpha
+    value = -math.inf
+    column = bestPiece = None
+
+    for i, (piece, move) in enumerate(moveList):
+        quiet = pos.board[move[0]][move[1]] == '--'
+        if futile and i > 0 and quiet:
+            searchStats['futilityPruned'] += 1
+            continue
+
+        childLine = pvLine[1:] if pvLine and pvLine[0] == (piece, move) else ()
+        reduction = lateMoveReduction(depth, i) if quiet and not moveOrderer.isKiller(ply, piece, move) else 0
+        pos.makeMove(piece, move)
+
+        # Late quiet moves are tried at a reduced depth first and only get the
+        # full depth when they beat alpha anyway
+        fullDepth = True
+        if reduction:
+            searchStats['reductions'] += 1
+            newScore = -search(pos, depth - 1 - reduction, -alpha - 1, -alpha)[1]
+            fullDepth = newScore > alpha
+            if fullDepth: searchStats['lmrResearches'] += 1
+
+        # Principal variation search: the first move gets the full window, the
+        # rest only have to prove they are no better, and are searched again
+        # with the full window when they are
+        if fullDepth and (i == 0 or not searchOptions['pvs']):
+            newScore = -search(pos, depth - 1, -beta, -alpha, childLine)[1]
+        elif fullDepth:
+            newScore = -search(pos, depth - 1, -alpha - 1, -alpha)[1]
+            if alpha < newScore < beta:
+                searchStats['pvsResearches'] += 1
+                newScore = -search(pos, depth - 1, -beta, -alpha, childLine)[1]
+
+        pos.unmakeMove()
+
+        if newScore > value:
+            value = newScore
+            column = move
+            bestPiece = piece
+        alpha = max(alpha, value)
+        if alpha >= beta:
+            moveOrderer.recordCutoff(pos.board, piece, move, ply, depth, i)
+            break
+
+        # Capturing the king cannot be beaten
+        if value == math.inf: break
+
+    storeResult(pos.hashKey, depth, value, alphaOrig, beta, column, bestPiece)
+    return (column, value, bestPiece)
+
+def lateMoveReduction(depth, moveIndex):
+    # By how much to shorten the search of the moveIndex-th move in the ordering
+    if not searchOptions['lmr'] or depth < lmrMinDepth or moveIndex < lmrMinMove: return 0
+    if moveIndex >= 6 and depth >= 5: return 2
+    return 1
+
+def storeResult(hashKey, depth, value, alpha, beta, move, piece):
+    if value <= alpha: flag = ALPHA
+    elif value >= beta: flag = BETA
+    else: flag = EXACT
+
+    transpositionTable.store(hashKey, depth, value, flag, move, piece)
+
+def principalVariation(board, color, depth):
+    # Follow the stored best moves from the root as long as they are still playable
+    pos = SearchBoard(board, color)
+    line = []
+    seen = set()
+
+    while len(line) < depth and pos.hashKey not in seen:
+        seen.add(pos.hashKey)
+        entry = transpositionTable.probe(pos.hashKey)
+        if entry is None or entry.piece is None: break
+        if entry.move not in generateMoves(pos, pos.color).get(entry.piece, []): break
+
+        line.append((entry.piece, entry.move))
+        pos.makeMove(entry.piece, entry.move)
+        if pos.isWon('kW') or pos.isWon('kB'): break
+
+    return line
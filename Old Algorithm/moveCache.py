@@ -0,0 +1,44 @@
+from collections import OrderedDict
+
+class MoveCache:
+    # LRU cache of generated moves keyed by the position's Zobrist key.
+    # Moves are stored by start square rather than piece name: two knights
+    # that swapped squares hash the same but have different names.
+    def __init__(self, maxEntries=50000, enabled=True):
+        self.maxEntries = maxEntries
+        self.enabled = enabled
+        self.clear()
+
+    def clear(self):
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, pos):
+        squareMoves = self.entries.get(pos.hashKey)
+        if squareMoves is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(pos.hashKey)
+        return {pos.board[row][col]: moves for (row, col), moves in squareMoves}
+
+    def put(self, pos, validMoves):
+        self.entries[pos.hashKey] = [(pos.locations[piece], moves) for piece, moves in validMoves.items()]
+        self.entries.move_to_end(pos.hashKey)
+
+        if len(self.entries) > self.maxEntries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.entries),
+            'hitRate': self.hits / lookups if lookups else 0.0,
+        }
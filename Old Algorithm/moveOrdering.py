@@ -0,0 +1,75 @@
+# Rough piece values, only used to rank captures (most valuable victim,
+# least valuable attacker)
+orderingValues = {'p': 1, 'n': 3, 'b': 3, 'r': 5, 'q': 9, 'k': 100}
+
+pvScore = 4000000
+hashScore = 3000000
+captureScore = 2000000
+killerScores = (1000002, 1000001)
+
+class MoveOrderer:
+    def __init__(self, maxPly=128):
+        self.maxPly = maxPly
+        self.enabled = True
+        self.history = {}
+        self.cutoffs = 0
+        self.firstMoveCutoffs = 0
+        self.newSearch()
+
+    def newSearch(self):
+        self.killers = [[None, None] for ply in range(self.maxPly)]
+
+        # Older history is worth less than what the new search finds
+        for key in self.history: self.history[key] //= 2
+
+    def clear(self):
+        self.history = {}
+        self.cutoffs = 0
+        self.firstMoveCutoffs = 0
+        self.newSearch()
+
+    def scoreMove(self, board, piece, move, ply, hashMove, pvMove):
+        if pvMove is not None and (piece, move) == pvMove: return pvScore
+        if hashMove is not None and (piece, move) == hashMove: return hashScore
+
+        captured = board[move[0]][move[1]]
+        if captured != '--': return captureScore + 10 * orderingValues[captured[0]] - orderingValues[piece[0]]
+
+        killers = self.killers[ply] if ply < self.maxPly else (None, None)
+        if (piece, move) == killers[0]: return killerScores[0]
+        if (piece, move) == killers[1]: return killerScores[1]
+
+        return self.history.get((piece[:2], move[0], move[1]), 0)
+
+    def orderMoves(self, board, validMoves, ply, hashMove=None, pvMove=None):
+        moveList = [(piece, move) for piece in validMoves for move in validMoves[piece]]
+        if not self.enabled: return moveList
+
+        moveList.sort(key=lambda pm: self.scoreMove(board, pm[0], pm[1], ply, hashMove, pvMove), reverse=True)
+        return moveList
+
+    def isKiller(self, ply, piece, move):
+        return ply < self.maxPly and (piece, move) in self.killers[ply]
+
+    def recordCutoff(self, board, piece, move, ply, depth, moveIndex):
+        self.cutoffs += 1
+        if moveIndex == 0: self.firstMoveCutoffs += 1
+
+        # Killers and history only make sense for quiet moves, captures are
+        # already sorted first
+        if board[move[0]][move[1]] != '--' or ply >= self.maxPly: return
+
+        killers = self.killers[ply]
+        if killers[0] != (piece, move):
+            killers[1] = killers[0]
+            killers[0] = (piece, move)
+
+        key = (piece[:2], move[0], move[1])
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    def stats(self):
+        return {
+            'cutoffs': self.cutoffs,
+            'firstMoveCutoffs': self.firstMoveCutoffs,
+            'firstMoveCutoffRate': self.firstMoveCutoffs / self.cutoffs if self.cutoffs else 0.0,
+        }
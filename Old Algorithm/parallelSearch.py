@@ -0,0 +1,84 @@
+import math
+import time
+import multiprocessing as mp
+from minimaxAI import *
+
+# Best root score found so far by any worker, set by the pool initializer.
+# Black maximizes, so for a black root it is an alpha bound, for white a beta bound.
+sharedBound = None
+
+def initWorker(bound):
+    global sharedBound
+    sharedBound = bound
+
+def searchRootMove(task):
+    board, color, piece, move, depth = task
+    maximizingPlayer = color == 'B'
+
+    pos = SearchBoard(board, color)
+    pos.makeMove(piece, move)
+
+    bound = sharedBound.value
+    alpha, beta = (bound, math.inf) if maximizingPlayer else (-math.inf, bound)
+
+    searchStats['nodes'] = 0
+    score = minimax(pos.board, depth - 1, alpha, beta, not maximizingPlayer, pos.color)[1]
+
+    # A move that fails against the shared bound only returns a bound, not its score
+    exact = alpha < score < beta
+
+    with sharedBound.get_lock():
+        if maximizingPlayer and score > sharedBound.value: sharedBound.value = score
+        if not maximizingPlayer and score < sharedBound.value: sharedBound.value = score
+
+    return piece, move, score, exact, searchStats['nodes']
+
+class ParallelSearch:
+    # Splits the root moves over a pool of worker processes. Every worker has
+    # its own transposition table; they share the best root score so later
+    # root moves are searched with a tighter window.
+    def __init__(self, workers=4):
+        self.workers = workers
+        self.bound = mp.Value('d', 0.0)
+        self.pool = mp.Pool(workers, initializer=initWorker, initargs=(self.bound,))
+        self.nodes = 0
+
+    def search(self, board, depth, color='B'):
+        maximizingPlayer = color == 'B'
+        self.bound.value = -math.inf if maximizingPlayer else math.inf
+
+        # Hand out the most promising root moves first
+        pos = SearchBoard(board, color)
+        moveList = moveOrderer.orderMoves(pos.board, generateMoves(pos, color), 0)
+        if depth <= 1 or len(moveList) <= 1:
+            return minimax(board, depth, -math.inf, math.inf, maximizingPlayer, color)
+
+        tasks = [(board, color, piece, move, depth) for piece, move in moveList]
+        order = {(piece, tuple(move)): i for i, (piece, move) in enumerate(moveList)}
+
+        best = None
+        self.nodes = 0
+        for piece, move, score, exact, nodes in self.pool.imap_unordered(searchRootMove, tasks):
+            self.nodes += nodes
+            rank = order[(piece, tuple(move))]
+
+            # Only a strictly better score replaces the best move. Equal scores
+            # go to an exact one over a bound, then to the move that came first
+            # in the ordering
+            better = best is None or (score > best[1] if maximizingPlayer else score < best[1])
+            tie = best is not None and score == best[1] and exact and (not best[4] or rank < best[3])
+            if better or tie:
+                best = (move, score, piece, rank, exact)
+
+        return best[:3]
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+def parallelMinimax(board, depth, color='B', workers=4):
+    searcher = ParallelSearch(workers)
+    try:
+        return searcher.search(board, depth, color)
+    finally:
+        searcher.close()
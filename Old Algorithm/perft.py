@@ -0,0 +1,120 @@
+import sys
+import time
+import argparse
+from bitboard import *
+import bitboardAdapter
+from minimaxAI import SearchBoard, generateMoves
+
+# Known-correct leaf counts from the Chess Programming Wiki perft results page
+perftPositions = {
+    'start': (startFen, [20, 400, 8902, 197281, 4865609]),
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', [48, 2039, 97862, 4085603]),
+    'position3': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2812, 43238, 674624]),
+    'position4': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', [6, 264, 9467, 422333]),
+    'position5': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', [44, 1486, 62379, 2103487]),
+    'position6': ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10', [46, 2079, 89890, 3894594]),
+}
+
+def perft(position, depth):
+    moves = position.legalMoves()
+    if depth <= 1: return len(moves) if depth == 1 else 1
+
+    nodes = 0
+    for move in moves:
+        position.makeMove(move)
+        nodes += perft(position, depth - 1)
+        position.unmakeMove()
+
+    return nodes
+
+# Same count over piece.findValidMoves on the string board. That generator has
+# no castling, en passant, promotion or check rules, so there is nothing to
+# compare against, but it shows the generator's speed.
+def legacyPerft(pos, depth):
+    if depth == 0: return 1
+
+    nodes = 0
+    for piece, moves in generateMoves(pos, pos.color).items():
+        for move in moves:
+            if depth == 1:
+                nodes += 1
+                continue
+
+            pos.makeMove(piece, move)
+            nodes += legacyPerft(pos, depth - 1)
+            pos.unmakeMove()
+
+    return nodes
+
+def divide(position, depth):
+    counts = []
+    for move in position.legalMoves():
+        position.makeMove(move)
+        counts.append((moveToUci(move), perft(position, depth - 1)))
+        position.unmakeMove()
+
+    return counts
+
+def legacyDivide(pos, depth):
+    counts = []
+    for piece, moves in generateMoves(pos, pos.color).items():
+        for move in moves:
+            pos.makeMove(piece, move)
+            counts.append((f'{piece}{move}', legacyPerft(pos, depth - 1)))
+            pos.unmakeMove()
+
+    return counts
+
+def toSearchBoard(fen):
+    position = Position(fen)
+    return SearchBoard(bitboardAdapter.toStringBoard(position), 'W' if position.whiteToMove else 'B')
+
+def runPerft(name, fen, depth, expected, backend):
+    start = time.perf_counter()
+    if backend == 'strings': nodes = legacyPerft(toSearchBoard(fen), depth)
+    else: nodes = perft(Position(fen), depth)
+    elapsed = time.perf_counter() - start
+
+    status = '-' if expected is None else ('ok' if nodes == expected else 'FAIL')
+    print(f'{name:<10} {depth:>5} {nodes:>10} {expected if expected is not None else "-":>10} {status:>5} {elapsed:>8.2f} {nodes / max(elapsed, 1e-9):>9.0f}')
+
+    return status != 'FAIL'
+
+def runDivide(fen, depth, backend):
+    start = time.perf_counter()
+    counts = legacyDivide(toSearchBoard(fen), depth) if backend == 'strings' else divide(Position(fen), depth)
+    elapsed = time.perf_counter() - start
+
+    for move, nodes in counts: print(f'{move}: {nodes}')
+    total = sum(nodes for move, nodes in counts)
+    print(f'\nmoves {len(counts)}  nodes {total}  {elapsed:.2f}s  {total / max(elapsed, 1e-9):.0f} nps')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Count leaf nodes of the move generator and check them against known results')
+    parser.add_argument('depth', type=int, nargs='?', default=3)
+    parser.add_argument('--position', choices=sorted(perftPositions), help='only run one of the standard positions')
+    parser.add_argument('--fen', help='run a custom position instead of the standard ones')
+    parser.add_argument('--divide', action='store_true', help='print the node count below every root move')
+    parser.add_argument('--backend', choices=['bitboard', 'strings'], default='bitboard', help='bitboard.Position or piece.findValidMoves')
+    args = parser.parse_args(argv)
+
+    if args.fen: positions = {'custom': (args.fen, [])}
+    elif args.position: positions = {args.position: perftPositions[args.position]}
+    else: positions = perftPositions
+
+    if args.divide:
+        for name, (fen, expected) in positions.items():
+            print(f'{name}: {fen}')
+            runDivide(fen, args.depth, args.backend)
+        return 0
+
+    print(f'{"position":<10} {"depth":>5} {"nodes":>10} {"expected":>10} {"":>5} {"seconds":>8} {"nps":>9}')
+    passed = True
+    for name, (fen, expected) in positions.items():
+        known = expected[args.depth - 1] if args.backend == 'bitboard' and 0 < args.depth <= len(expected) else None
+        passed = runPerft(name, fen, args.depth, known, args.backend) and passed
+
+    return 0 if passed else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,5 @@
 from constants import *
 
-pawnsMoved = []
-
 def findValidMoves(piece, row, col, board):
     if 'W' in piece:
         oppColor = 'B'
@@ -56,10 +54,10 @@ def getPawnMoves(row, col, selfColor, oppColor, board, pawn):
     if selfColor == 'W': validMoves = [[row - 1, col], [row - 1, col - 1], [row - 1, col + 1]]
     if selfColor == 'B': validMoves = [[row + 1, col], [row + 1, col - 1], [row + 1, col + 1]]
 
-    if pawn not in pawnsMoved:
-        if selfColor == 'W': validMoves.append([row - 2, col])
-        else: validMoves.append([row + 2, col])
-        pawnsMoved.append(pawn)
+    # Pawns never come back to their start rank, so being on it means the pawn
+    # has not moved yet and may go two squares if nothing is in the way
+    if selfColor == 'W' and row == 6 and '--' in board[5][col]: validMoves.append([4, col])
+    if selfColor == 'B' and row == 1 and '--' in board[2][col]: validMoves.append([3, col])
 
     added = True
     for [rowL, colL] in validMoves:
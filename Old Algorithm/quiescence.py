@@ -0,0 +1,80 @@
+import math
+from moveOrdering import orderingValues
+
+class QuiescenceSearch:
+    # Capture-only search run at the horizon so exchanges are finished before
+    # the position is evaluated. Like QuiescenceSearch.cs it is handed the
+    # evaluation and move generator it should use.
+    def __init__(self, evaluate, generateMoves, pieceValues, nodeLimit=2000, deltaMargin=200):
+        self.evaluate = evaluate
+        self.generateMoves = generateMoves
+        self.pieceValues = pieceValues
+        self.nodeLimit = nodeLimit
+        self.deltaMargin = deltaMargin
+        self.enabled = True
+        self.clear()
+
+    def clear(self):
+        self.nodes = 0
+        self.standPatCutoffs = 0
+        self.deltaPruned = 0
+        self.limitHits = 0
+        self.treeNodes = 0
+
+    def captures(self, pos):
+        board = pos.board
+        validMoves = self.generateMoves(pos, pos.color)
+        moveList = [(piece, move) for piece in validMoves for move in validMoves[piece] if board[move[0]][move[1]] != '--']
+        moveList.sort(key=lambda pm: 10 * orderingValues[board[pm[1][0]][pm[1][1]][0]] - orderingValues[pm[0][0]], reverse=True)
+
+        return moveList
+
+    def search(self, pos, alpha, beta):
+        # Entry from the main search's horizon, the node limit is per entry
+        self.treeNodes = 0
+        return self.quiesce(pos, alpha, beta)
+
+    def quiesce(self, pos, alpha, beta):
+        # Negamax like the main search: scores are for the side to move
+        self.nodes += 1
+        self.treeNodes += 1
+
+        if pos.isWon('kW'): return math.inf if pos.color == 'B' else -math.inf
+        if pos.isWon('kB'): return math.inf if pos.color == 'W' else -math.inf
+
+        standPat = self.evaluate(pos) if pos.color == 'B' else -self.evaluate(pos)
+        if self.treeNodes >= self.nodeLimit:
+            self.limitHits += 1
+            return standPat
+
+        if standPat >= beta:
+            self.standPatCutoffs += 1
+            return standPat
+        alpha = max(alpha, standPat)
+        value = standPat
+
+        for piece, move in self.captures(pos):
+            captured = pos.board[move[0]][move[1]]
+
+            # Even winning this piece for free would not lift the score to alpha
+            if captured[0] != 'k' and standPat + self.pieceValues[captured[0]] + self.deltaMargin <= alpha:
+                self.deltaPruned += 1
+                continue
+
+            pos.makeMove(piece, move)
+            score = -self.quiesce(pos, -beta, -alpha)
+            pos.unmakeMove()
+
+            value = max(value, score)
+            if value >= beta: return value
+            alpha = max(alpha, value)
+
+        return value
+
+    def stats(self):
+        return {
+            'nodes': self.nodes,
+            'standPatCutoffs': self.standPatCutoffs,
+            'deltaPruned': self.deltaPruned,
+            'limitHits': self.limitHits,
+        }
@@ -0,0 +1,118 @@
+import random
+from zobrist import *
+from evaluation import *
+import bitboardAdapter
+
+class SearchBoard:
+    def __init__(self, board, color):
+        self.board = [row[:] for row in board]
+        self.color = color
+        self.hashKey = hashBoard(self.board, color)
+        self.history = []
+
+        # Running evaluation terms, kept up to date by makeMove/unmakeMove
+        self.middlegame, self.endgame, self.phase = evaluationTerms(self.board)
+
+        # Where every piece stands, None once it has been captured. Captured
+        # pieces keep their key so the iteration order never changes.
+        self.locations = {}
+        for r in range(len(self.board)):
+            for c in range(len(self.board[r])):
+                if self.board[r][c] != '--': self.locations[self.board[r][c]] = (r, c)
+
+    def makeMove(self, piece, move):
+        start = self.locations[piece]
+        captured = self.board[move[0]][move[1]]
+
+        self.history.append((piece, start, captured, self.hashKey, self.middlegame, self.endgame, self.phase))
+        self.hashKey = hashMove(self.hashKey, piece, start, move, captured)
+
+        mgFrom, egFrom = pieceSquareScores(piece, start[0], start[1])
+        mgTo, egTo = pieceSquareScores(piece, move[0], move[1])
+        self.middlegame += mgTo - mgFrom
+        self.endgame += egTo - egFrom
+
+        if captured != '--':
+            mg, eg = pieceSquareScores(captured, move[0], move[1])
+            self.middlegame -= mg
+            self.endgame -= eg
+            self.phase -= phaseWeights[captured[0]]
+
+        self.board[start[0]][start[1]] = '--'
+        self.board[move[0]][move[1]] = piece
+        self.locations[piece] = (move[0], move[1])
+        if captured != '--': self.locations[captured] = None
+
+        self.color = 'W' if self.color == 'B' else 'B'
+
+    def makeNullMove(self):
+        # Pass the turn, only the side to move and its hash bit change
+        self.history.append((None, None, '--', self.hashKey, self.middlegame, self.endgame, self.phase))
+        self.hashKey ^= sideKey
+        self.color = 'W' if self.color == 'B' else 'B'
+
+    def unmakeMove(self):
+        piece, start, captured, hashKey, self.middlegame, self.endgame, self.phase = self.history.pop()
+        if piece is None:
+            self.hashKey = hashKey
+            self.color = 'W' if self.color == 'B' else 'B'
+            return
+
+        row, col = self.locations[piece]
+
+        self.board[row][col] = captured
+        self.board[start[0]][start[1]] = piece
+        self.locations[piece] = start
+        if captured != '--': self.locations[captured] = (row, col)
+
+        self.hashKey = hashKey
+        self.color = 'W' if self.color == 'B' else 'B'
+
+    def evaluate(self):
+        return taper(self.middlegame, self.endgame, self.phase)
+
+    def isWon(self, king):
+        return self.locations.get(king) is None
+
+    def lastMoveWasNull(self):
+        return bool(self.history) and self.history[-1][0] is None
+
+    def hasPieces(self, color):
+        # Anything besides pawns and the king, positions without are the
+        # ones where passing might be the best move (zugzwang)
+        for piece, square in self.locations.items():
+            if square is not None and piece[1] == color and piece[0] not in 'pk': return True
+
+        return False
+
+    def pieces(self, color):
+        for piece, square in self.locations.items():
+            if square is not None and piece[1] == color: yield piece, square
+
+def checkIncrementalEvaluation(games=50, plies=100, seed=0):
+    # Plays random games and compares the running evaluation with a full
+    # recompute after every move and again while taking the moves back
+    rng = random.Random(seed)
+    checks = 0
+
+    for game in range(games):
+        pos = SearchBoard(bitboardAdapter.toStringBoard(bitboardAdapter.Position()), 'W')
+
+        for ply in range(plies):
+            if pos.isWon('kW') or pos.isWon('kB'): break
+
+            moves = [(piece, move) for piece, moveList in bitboardAdapter.findPossibleMoves(pos.board, pos.color).items() for move in moveList]
+            if not moves: break
+
+            pos.makeMove(*rng.choice(moves))
+            checks += 1
+            if pos.evaluate() != evaluation(pos.board):
+                raise AssertionError(f'game {game} ply {ply}: incremental {pos.evaluate()} != full {evaluation(pos.board)}')
+
+        while pos.history:
+            pos.unmakeMove()
+            checks += 1
+            if pos.evaluate() != evaluation(pos.board):
+                raise AssertionError(f'game {game} unmake: incremental {pos.evaluate()} != full {evaluation(pos.board)}')
+
+    return checks
@@ -0,0 +1,23 @@
+import threading
+from iterativeDeepening import *
+
+class SearchHandle:
+    # Runs iterativeDeepening on a worker thread so the caller can keep going
+    # and poll done() / result.
+    def __init__(self, board, timeLimitMs, color='B'):
+        self.board = [row[:] for row in board]
+        self.result = None
+        self.stopEvent = threading.Event()
+
+        self.thread = threading.Thread(target=self.run, args=(timeLimitMs, color), daemon=True)
+        self.thread.start()
+
+    def run(self, timeLimitMs, color):
+        self.result = iterativeDeepening(self.board, timeLimitMs, color, stopEvent=self.stopEvent)
+
+    def done(self):
+        return not self.thread.is_alive()
+
+    def cancel(self):
+        self.stopEvent.set()
+        self.thread.join()
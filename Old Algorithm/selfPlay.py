@@ -0,0 +1,144 @@
+import sys
+import math
+import time
+import random
+import argparse
+import minimaxAI
+from minimaxAI import *
+from iterativeDeepening import iterativeDeepening
+from benchmark import benchmarkPositions, boardFromRows
+
+# Search settings the players can be given, anything not named keeps its default
+configurations = {
+    'baseline': {'nullMove': False, 'lmr': False, 'futility': False},
+    'selective': {'nullMove': True, 'lmr': True, 'futility': True},
+    'nullMove': {'nullMove': True, 'lmr': False, 'futility': False},
+    'lmr': {'nullMove': False, 'lmr': True, 'futility': False},
+    'futility': {'nullMove': False, 'lmr': False, 'futility': True},
+}
+
+class PlayerStats:
+    def __init__(self):
+        self.moves = 0
+        self.nodes = 0
+        self.depth = 0
+        self.seconds = 0.0
+
+    def nps(self):
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def averageDepth(self):
+        return self.depth / self.moves if self.moves else 0.0
+
+def openingBoards(count, randomPlies, seed):
+    # The benchmark positions, each followed by a few random moves so the
+    # games do not all repeat
+    rng = random.Random(seed)
+    names = list(benchmarkPositions)
+    openings = []
+
+    while len(openings) < count:
+        name = names[len(openings) % len(names)]
+        pos = SearchBoard(boardFromRows(benchmarkPositions[name]), 'W')
+
+        for ply in range(randomPlies):
+            moves = [(piece, move) for piece, moveList in generateMoves(pos, pos.color).items() for move in moveList]
+            if not moves: break
+            pos.makeMove(*rng.choice(moves))
+
+        if not pos.isWon('kW') and not pos.isWon('kB'): openings.append((pos.board, pos.color))
+
+    return openings
+
+def searchMove(pos, options, moveTimeMs, maxDepth, stats):
+    minimaxAI.searchOptions.update(options)
+
+    # Neither player gets to reuse what the other one searched
+    minimaxAI.transpositionTable.clear()
+    minimaxAI.moveOrderer.clear()
+
+    iterations = []
+    start = time.perf_counter()
+    column, value, piece = iterativeDeepening(pos.board, moveTimeMs, pos.color, maxDepth=maxDepth, report=iterations.append)
+
+    stats.seconds += time.perf_counter() - start
+    stats.moves += 1
+    stats.nodes += sum(info['nodes'] + info['qnodes'] for info in iterations)
+    stats.depth += iterations[-1]['depth'] if iterations else 0
+
+    return piece, column
+
+def playGame(board, color, white, black, moveTimeMs, maxDepth, maxPlies, adjudicateMargin, stats):
+    # Returns white's score: 1 for a win, 0.5 for a draw and 0 for a loss
+    pos = SearchBoard(board, color)
+    players = {'W': white, 'B': black}
+
+    for ply in range(maxPlies):
+        if pos.isWon('kW'): return 0.0
+        if pos.isWon('kB'): return 1.0
+
+        name = players[pos.color]
+        piece, move = searchMove(pos, configurations[name], moveTimeMs, maxDepth, stats[name])
+        if piece is None: return 0.5
+
+        pos.makeMove(piece, move)
+
+    if pos.isWon('kW'): return 0.0
+    if pos.isWon('kB'): return 1.0
+
+    # Out of moves, decide by material and position
+    score = pos.evaluate()
+    if score >= adjudicateMargin: return 0.0
+    if score <= -adjudicateMargin: return 1.0
+    return 0.5
+
+def eloDifference(score):
+    if score <= 0: return -math.inf
+    if score >= 1: return math.inf
+    return -400 * math.log10(1 / score - 1)
+
+def runMatch(playerA, playerB, openings, moveTimeMs=200, maxDepth=64, maxPlies=80, adjudicateMargin=300, report=print):
+    # Every opening is played twice with colors swapped, scores are from A's side
+    defaults = dict(minimaxAI.searchOptions)
+    stats = {playerA: PlayerStats(), playerB: PlayerStats()} if playerA != playerB else {playerA: PlayerStats()}
+    points = 0.0
+    games = 0
+
+    try:
+        for i, (board, color) in enumerate(openings):
+            for white, black in ((playerA, playerB), (playerB, playerA)):
+                result = playGame(board, color, white, black, moveTimeMs, maxDepth, maxPlies, adjudicateMargin, stats)
+                points += result if white == playerA else 1 - result
+                games += 1
+                if report is not None: report(f'game {games:>3}  opening {i}  {white} - {black}  {result}')
+    finally:
+        minimaxAI.searchOptions.clear()
+        minimaxAI.searchOptions.update(defaults)
+
+    return points, games, stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Play two search configurations against each other')
+    parser.add_argument('playerA', nargs='?', choices=sorted(configurations), default='selective')
+    parser.add_argument('playerB', nargs='?', choices=sorted(configurations), default='baseline')
+    parser.add_argument('--openings', type=int, default=6, help='number of starting positions, each is played with both colors')
+    parser.add_argument('--random-plies', type=int, default=2, help='random moves played from the benchmark positions')
+    parser.add_argument('--time', type=int, default=200, help='milliseconds per move')
+    parser.add_argument('--depth', type=int, default=64, help='depth limit per move, use with a large --time for fixed depth games')
+    parser.add_argument('--max-plies', type=int, default=80, help='games still going after this many plies are adjudicated')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    openings = openingBoards(args.openings, args.random_plies, args.seed)
+    points, games, stats = runMatch(args.playerA, args.playerB, openings, args.time, args.depth, args.max_plies)
+
+    score = points / games
+    print(f'{args.playerA} vs {args.playerB}: {points}/{games} ({score:.1%}), elo {eloDifference(score):+.0f}')
+    print(f'{"player":<10} {"moves":>6} {"nodes/s":>9} {"avg depth":>10} {"s/move":>7}')
+    for name, player in stats.items():
+        print(f'{name:<10} {player.moves:>6} {player.nps():>9.0f} {player.averageDepth():>10.2f} {player.seconds / max(player.moves, 1):>7.3f}')
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
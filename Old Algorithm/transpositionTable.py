@@ -0,0 +1,72 @@
+from collections import namedtuple
+
+# Bound types, same meaning as TranspositionTable.cs
+EXACT, ALPHA, BETA = 0, 1, 2
+
+TTEntry = namedtuple('TTEntry', ['key', 'depth', 'score', 'flag', 'move', 'piece', 'age'])
+
+# Rough size of one stored entry in CPython (tuple + key int + slot pointer)
+entrySize = 160
+
+class TranspositionTable:
+    def __init__(self, sizeMB=32):
+        self.resize(sizeMB)
+
+    def resize(self, sizeMB):
+        entries = max(1, int(sizeMB * 1024 * 1024) // entrySize)
+        self.size = 1 << (entries.bit_length() - 1)
+        self.mask = self.size - 1
+        self.clear()
+
+    def clear(self):
+        self.table = [None] * self.size
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.replaced = 0
+
+    def newSearch(self):
+        self.age += 1
+
+    def probe(self, key):
+        entry = self.table[key & self.mask]
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.key != key:
+            self.collisions += 1
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry
+
+    def store(self, key, depth, score, flag, move, piece):
+        i = key & self.mask
+        entry = self.table[i]
+
+        if entry is not None:
+            # Keep deeper results from the current search, anything older can go
+            if entry.age == self.age and entry.depth > depth and entry.key != key: return
+            self.replaced += 1
+
+        self.table[i] = TTEntry(key, depth, score, flag, move, piece, self.age)
+        self.stores += 1
+
+    def stats(self):
+        probes = self.hits + self.misses
+        used = sum(1 for entry in self.table if entry is not None)
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'replaced': self.replaced,
+            'hitRate': self.hits / probes if probes else 0.0,
+            'fill': used / self.size,
+        }
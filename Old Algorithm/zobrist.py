@@ -0,0 +1,32 @@
+import random
+
+# Fixed seed so hashes are reproducible between runs and processes
+rng = random.Random(0x5EED)
+
+pieceKeys = {}
+for kind in 'pnbrqk':
+    for color in 'WB':
+        pieceKeys[kind + color] = [[rng.getrandbits(64) for c in range(8)] for r in range(8)]
+
+# Xored in when black is to move
+sideKey = rng.getrandbits(64)
+
+def pieceKey(piece, row, col):
+    # 'pB3' and 'pB' hash the same, only the kind and color matter
+    return pieceKeys[piece[:2]][row][col]
+
+def hashBoard(board, color):
+    key = 0
+    for r in range(len(board)):
+        for c in range(len(board[r])):
+            if board[r][c] != '--': key ^= pieceKey(board[r][c], r, c)
+
+    if color == 'B': key ^= sideKey
+
+    return key
+
+def hashMove(key, piece, start, move, captured):
+    key ^= pieceKey(piece, start[0], start[1]) ^ pieceKey(piece, move[0], move[1]) ^ sideKey
+    if captured != '--': key ^= pieceKey(captured, move[0], move[1])
+
+    return key